@@ -0,0 +1,263 @@
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PySide6.QtWidgets import QApplication, QMenu
+from PySide6.QtCore import QObject, QUrl, QEvent, Signal
+from PySide6.QtGui import QAction
+from PySide6.QtWebEngineCore import QWebEngineUrlRequestInfo
+from main import (
+    DomainBlocklist, CompiledBlocklist, UrlFilterIndex, AdBlockInterceptor, BookmarkStore, DownloadListModel, Browser
+)
+
+BENCHMARKS = {}
+LOOKUPS = 10000
+TLDS = ("com", "net", "org", "io", "de", "co.uk")
+
+def benchmark(name, extra_sizes=()):
+    def register(setup):
+        BENCHMARKS[name] = (setup, extra_sizes); return setup
+    return register
+
+def word(rng, length=8):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(length))
+
+def synthetic_domains(rng, count):
+    return [f"{word(rng, rng.randint(4, 12))}{index}.{rng.choice(TLDS)}" for index in range(count)]
+
+def synthetic_urls(rng, domains, count, hit_ratio=0.3):
+    urls = []
+    for _ in range(count):
+        host = f"{rng.choice(('cdn', 'static', 'www', 'img'))}.{rng.choice(domains)}" if rng.random() < hit_ratio else f"www.{word(rng)}.{rng.choice(TLDS)}"
+        urls.append((f"https://{host}/{word(rng, 5)}/{word(rng, 10)}.js?v={rng.randint(1, 999)}", host))
+    return urls
+
+def synthetic_filters(rng, count):
+    kinds = (
+        lambda: f"||{word(rng)}.{rng.choice(TLDS)}^",
+        lambda: f"||{word(rng)}.{rng.choice(TLDS)}/{word(rng, 6)}/*^$script,third-party",
+        lambda: f"/{word(rng, 6)}/banner*.{rng.choice(('gif', 'png', 'js'))}",
+        lambda: f"@@||{word(rng)}.{rng.choice(TLDS)}^$document",
+        lambda: f"-{word(rng, 7)}-ad-",
+    )
+    return [rng.choice(kinds)() for _ in range(count)]
+
+def synthetic_bookmarks(rng, count):
+    folders = [""] + [word(rng, 6).capitalize() for _ in range(max(1, int(count ** 0.5)))]
+    return [(f"https://{word(rng)}.{rng.choice(TLDS)}/{index}", word(rng, 12).capitalize(), rng.choice(folders)) for index in range(count)]
+
+class SynchronousExecutor:
+    def submit(self, function, *args): return function(*args)
+
+class FakeRequestInfo:
+    __slots__ = ("url", "first_party", "resource_type", "blocked")
+
+    def __init__(self, url, first_party):
+        self.url, self.first_party = QUrl(url), QUrl(first_party)
+        self.resource_type = QWebEngineUrlRequestInfo.ResourceType.ResourceTypeScript
+        self.blocked = False
+
+    def requestUrl(self): return self.url
+    def firstPartyUrl(self): return self.first_party
+    def resourceType(self): return self.resource_type
+    def block(self, blocked): self.blocked = blocked
+
+class BookmarkMenuHarness(QObject):
+    # Borrows the Browser's bookmark handlers without building a whole window and web profile
+    bookmarks_loaded_signal = Signal(list)
+    critical_error_signal = Signal(str)
+    update_bookmark_menu = Browser.update_bookmark_menu
+    bookmark_folder_menu = Browser.bookmark_folder_menu
+    create_bookmark_action = Browser.create_bookmark_action
+    populate_bookmark_menu = Browser.populate_bookmark_menu
+    add_more_bookmarks_menu = Browser.add_more_bookmarks_menu
+    populate_more_bookmarks_menu = Browser.populate_more_bookmarks_menu
+    populate_bookmark_chunk = Browser.populate_bookmark_chunk
+    remove_more_bookmarks_menu = Browser.remove_more_bookmarks_menu
+    BOOKMARK_MENU_CHUNK = Browser.BOOKMARK_MENU_CHUNK
+    on_bookmark_added = Browser.on_bookmark_added
+    _load_bookmarks_from_file = Browser._load_bookmarks_from_file
+    _save_bookmarks_to_file = Browser._save_bookmarks_to_file
+
+    def __init__(self, bookmark_store):
+        super().__init__()
+        self.bookmark_store = bookmark_store
+        self.bookmark_menu = QMenu("Bookmarks")
+        self.remove_bookmark_action = QAction("Remove Bookmark", self); self.bookmark_menu.addAction(self.remove_bookmark_action)
+        self.bookmark_folders_separator = self.bookmark_menu.addSeparator()
+        self.bookmark_folder_menus, self.bookmark_actions, self.bookmark_more_menus, self.populated_bookmark_menus = {}, {}, {}, set()
+
+    def current_browser(self): return None
+    def navigate_bookmark(self): pass
+    def on_bookmark_hovered(self): pass
+
+class FakeDownload:
+    __slots__ = ("file_name", "path", "bytes_received", "bytes_total", "current_state")
+
+    def __init__(self, index, total):
+        self.file_name = f"file-{index}.bin"; self.path = "/tmp/" + self.file_name
+        self.bytes_received, self.bytes_total, self.current_state = 0, total, "Downloading"
+
+    def received(self): return self.bytes_received
+    def total(self): return self.bytes_total
+    def state(self): return self.current_state
+    def error(self): return ""
+
+def bookmark_store(rng, size, directory, folders=True):
+    store = BookmarkStore(os.path.join(directory, f"bookmarks-{size}.jsonl"), SynchronousExecutor())
+    for url, title, folder in synthetic_bookmarks(rng, size): store._add(url, title, folder if folders else "")
+    return store
+
+@benchmark("blocklist.domain")
+def bench_domain_blocklist(rng, size, directory):
+    domains = synthetic_domains(rng, size)
+    blocklist, hosts = DomainBlocklist(domains), [host for _, host in synthetic_urls(rng, domains, LOOKUPS)]
+    return lambda: [blocklist.matches(host) for host in hosts], LOOKUPS
+
+@benchmark("blocklist.compiled")
+def bench_compiled_blocklist(rng, size, directory):
+    domains = synthetic_domains(rng, size)
+    file_name = os.path.join(directory, f"blocklist-{size}.bin")
+    CompiledBlocklist.write(file_name, {CompiledBlocklist.hash_domain(domain) for domain in domains})
+    blocklist, hosts = CompiledBlocklist(file_name), [host for _, host in synthetic_urls(rng, domains, LOOKUPS)]
+    return lambda: [blocklist.matches(host) for host in hosts], LOOKUPS
+
+@benchmark("filters.match")
+def bench_url_filters(rng, size, directory):
+    index = UrlFilterIndex.from_lines(synthetic_filters(rng, size))
+    urls = synthetic_urls(rng, synthetic_domains(rng, 100), LOOKUPS)
+    return lambda: [index.matches(url, host, "script", "www.example.com") for url, host in urls], LOOKUPS
+
+@benchmark("interceptor.request")
+def bench_intercept_request(rng, size, directory):
+    domains = synthetic_domains(rng, size)
+    file_name = os.path.join(directory, f"interceptor-{size}.bin")
+    CompiledBlocklist.write(file_name, {CompiledBlocklist.hash_domain(domain) for domain in domains})
+    interceptor = AdBlockInterceptor(CompiledBlocklist(file_name), UrlFilterIndex.from_lines(synthetic_filters(rng, size)))
+    requests = [FakeRequestInfo(url, "https://www.example.com/") for url, _ in synthetic_urls(rng, domains, LOOKUPS)]
+    return lambda: [interceptor.interceptRequest(info) for info in requests], LOOKUPS
+
+# 20k bookmarks all outside folders is what a large legacy import or years of "Bookmark This Page" leave behind
+@benchmark("bookmarks.menu_build", extra_sizes=(20000,))
+def bench_bookmark_menu(rng, size, directory):
+    store = bookmark_store(rng, size, directory, folders=False)
+    def run():
+        harness = BookmarkMenuHarness(store)
+        harness.update_bookmark_menu()
+        for folder in store.folders(): harness.populate_bookmark_menu(folder)
+        harness.bookmark_menu.deleteLater()
+    return run, size
+
+@benchmark("bookmarks.added_storm")
+def bench_bookmark_added_storm(rng, size, directory):
+    store, entries = bookmark_store(rng, 0, directory), synthetic_bookmarks(rng, size)
+    def run():
+        harness = BookmarkMenuHarness(store); harness.update_bookmark_menu()
+        for folder in {folder for _, _, folder in entries}: harness.populate_bookmark_menu(folder)
+        store.bookmark_added.connect(harness.on_bookmark_added)
+        for url, title, folder in entries: store.bookmark_added.emit(url, title, folder)
+        store.bookmark_added.disconnect(harness.on_bookmark_added); harness.bookmark_menu.deleteLater()
+    return run, size
+
+@benchmark("bookmarks.log_load")
+def bench_bookmark_log_load(rng, size, directory):
+    log_path = os.path.join(directory, f"log-load-{size}.jsonl")
+    BookmarkStore(log_path, SynchronousExecutor()).add_many(synthetic_bookmarks(rng, size))
+    return lambda: BookmarkStore(log_path, SynchronousExecutor()).load(), size
+
+@benchmark("bookmarks.add_many")
+def bench_bookmark_add_many(rng, size, directory):
+    entries, log_path = [list(entry) for entry in synthetic_bookmarks(rng, size)], os.path.join(directory, f"add-many-{size}.jsonl")
+    def run():
+        if os.path.exists(log_path): os.remove(log_path)
+        BookmarkStore(log_path, SynchronousExecutor()).add_many(entries)
+    return run, size
+
+@benchmark("bookmarks.json_export")
+def bench_bookmark_json_export(rng, size, directory):
+    harness, file_name = BookmarkMenuHarness(bookmark_store(rng, size, directory)), os.path.join(directory, f"export-{size}.json")
+    return lambda: harness._save_bookmarks_to_file(file_name, harness.bookmark_store.export()), size
+
+@benchmark("bookmarks.json_import")
+def bench_bookmark_json_import(rng, size, directory):
+    harness, file_name = BookmarkMenuHarness(bookmark_store(rng, size, directory)), os.path.join(directory, f"import-{size}.json")
+    harness._save_bookmarks_to_file(file_name, harness.bookmark_store.export())
+    return lambda: harness._load_bookmarks_from_file(file_name), size
+
+@benchmark("downloads.refresh_tick")
+def bench_download_refresh(rng, size, directory):
+    model, records = DownloadListModel(), [FakeDownload(index, 1 << 30) for index in range(size)]
+    for record in records: model.add(record)
+    model.timer.stop()
+    def run():
+        for record in records: record.bytes_received += rng.randint(1 << 10, 1 << 20)
+        model.refresh_active()
+    return run, size
+
+@benchmark("downloads.progress_storm")
+def bench_download_progress_storm(rng, size, directory):
+    model, records = DownloadListModel(), [FakeDownload(index, 1 << 30) for index in range(min(size, 100))]
+    for record in records: model.add(record)
+    model.timer.stop()
+    def run():
+        for step in range(size):
+            record = records[step % len(records)]; record.bytes_received += 4096
+            model.record_changed(record)
+    return run, size
+
+def measure(run, repeat):
+    run()
+    timings = []
+    for _ in range(repeat):
+        gc.collect(); gc.disable()
+        try:
+            start = time.perf_counter_ns(); run(); timings.append(time.perf_counter_ns() - start)
+        finally: gc.enable()
+        QApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete); QApplication.processEvents()
+    return timings
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Microbenchmarks for DBB Browser hot paths")
+    parser.add_argument("--sizes", help="comma-separated input sizes (default: 100,1000,10000 plus the extra sizes of some benchmarks)")
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per benchmark after one warm-up run (default: 7)")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--seed", type=int, default=1234, help="seed for the synthetic data (default: 1234)")
+    parser.add_argument("--json", metavar="FILE", help="write the results to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="show the change against results saved with --json")
+    args = parser.parse_args(argv[1:])
+    app = QApplication.instance() or QApplication(argv[:1])
+    sizes = [int(size) for size in (args.sizes or "100,1000,10000").split(",")]
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r") as f: baseline = {(entry["name"], entry["size"]): entry for entry in json.load(f)["results"]}
+
+    results = []
+    print(f"{'benchmark':<26}{'size':>8}{'median ms':>11}{'min ms':>10}{'ns/op':>10}{'spread':>8}" + (f"{'vs base':>9}" if baseline else ""))
+    with tempfile.TemporaryDirectory(prefix="dbb-bench-") as directory:
+        for name, (setup, extra_sizes) in BENCHMARKS.items():
+            if args.filter not in name: continue
+            for size in sizes + [size for size in extra_sizes if size not in sizes and not args.sizes]:
+                run, operations = setup(random.Random(f"{args.seed}:{name}:{size}"), size, directory)
+                timings = measure(run, args.repeat)
+                median, fastest = statistics.median(timings), min(timings)
+                # Spread is the interquartile range relative to the median; rerun noisy entries before comparing
+                quartiles = statistics.quantiles(timings, n=4) if len(timings) > 1 else (median, median, median)
+                entry = {"name": name, "size": size, "median_ns": median, "min_ns": fastest, "ns_per_op": median / operations,
+                         "spread": (quartiles[2] - quartiles[0]) / median if median else 0, "timings_ns": timings}
+                results.append(entry)
+                line = f"{name:<26}{size:>8}{median / 1e6:>11.2f}{fastest / 1e6:>10.2f}{entry['ns_per_op']:>10.0f}{entry['spread']:>8.1%}"
+                if base := baseline.get((name, size)): line += f"{median / base['median_ns'] - 1:>+9.1%}"
+                print(line, flush=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "seed": args.seed, "repeat": args.repeat, "results": results}, f, indent=4)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,19 +1,74 @@
+import os
 import sys
+import re
+import csv
 import json
+import argparse
+import functools
+import mmap
+import array
+import bisect
+import heapq
+import struct
+import sqlite3
+import time
+import hashlib
+import shutil
+import collections
+import itertools
+import threading
 import concurrent.futures
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QTabWidget, QVBoxLayout, QWidget, QLineEdit,
     QToolBar, QFileDialog, QMessageBox, QPushButton, QProgressBar, QStyle,
     QLabel, QHBoxLayout, QTabBar, QMenu, QDockWidget, QListWidget, QListWidgetItem,
-    QDialog, QGroupBox, QComboBox, QCheckBox
+    QDialog, QGroupBox, QComboBox, QCheckBox, QSpinBox, QCompleter, QListView,
+    QStyledItemDelegate, QStyleOptionProgressBar, QTableView, QHeaderView, QInputDialog
 )
 from PySide6.QtWebEngineWidgets import QWebEngineView
 from PySide6.QtWebEngineCore import (
     QWebEngineProfile, QWebEngineDownloadRequest, QWebEngineSettings,
-    QWebEngineUrlRequestInterceptor
+    QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo, QWebEnginePage
 )
-from PySide6.QtCore import QUrl, Qt, Signal, QObject, QSize
-from PySide6.QtGui import QAction, QKeySequence, QIcon
+from PySide6.QtCore import (
+    QUrl, Qt, Signal, QObject, QSize, QStandardPaths, QTimer, QModelIndex, QByteArray, QDataStream, QIODevice,
+    QAbstractListModel, QRect
+)
+from PySide6.QtGui import QAction, QKeySequence, QIcon, QStandardItemModel, QStandardItem, QDesktopServices, QColor
+
+class StartupTrace:
+    def __init__(self):
+        self.started = self.process_started()
+        self.marks, self.labels = [], set()
+        self.enabled, self.reported = False, False
+        self.required = {"first load finished", "idle setup done"}
+        self.mark("imports")
+
+    @staticmethod
+    def process_started():
+        # /proc/self/stat has the exec time in clock ticks since boot, which also covers interpreter start-up
+        try:
+            with open("/proc/self/stat", "r") as f: ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+            return time.perf_counter() - (time.clock_gettime(time.CLOCK_BOOTTIME) - ticks / os.sysconf("SC_CLK_TCK"))
+        except (OSError, ValueError, IndexError, AttributeError): return None
+
+    def mark(self, label):
+        self.marks.append((label, time.perf_counter())); self.labels.add(label)
+        if self.enabled and not self.reported and self.required <= self.labels: self.report()
+
+    def mark_once(self, label):
+        if label not in self.labels: self.mark(label)
+
+    def report(self):
+        if self.reported or not self.marks: return
+        self.reported = True
+        started = self.started if self.started is not None else self.marks[0][1]
+        lines = [f"{'startup phase':<34}{'at ms':>9}{'took ms':>9}"]; previous = started
+        for label, at in self.marks:
+            lines.append(f"{label:<34}{(at - started) * 1000:>9.1f}{(at - previous) * 1000:>9.1f}"); previous = at
+        print("\n".join(lines), file=sys.stderr)
+
+startup_trace = StartupTrace()
 
 DARK_MODE_QSS = """
     QWidget { background-color: #2b2b2b; color: #ffffff; border: none; }
@@ -55,27 +110,509 @@ LIGHT_MODE_QSS = """
     QGroupBox { font-weight: bold; }
 """
 
+class DomainBlocklist:
+    HOSTS_IGNORED = {"localhost", "localhost.localdomain", "local", "broadcasthost", "ip6-localhost", "ip6-loopback", "0.0.0.0"}
+
+    def __init__(self, domains=(), exceptions=()):
+        self.domains = {d for d in map(self.normalize, domains) if d}
+        self.exceptions = {d for d in map(self.normalize, exceptions) if d}
+
+    def __len__(self): return len(self.domains)
+
+    @staticmethod
+    def normalize(domain):
+        return domain.strip().strip(".").lower()
+
+    @classmethod
+    def parse_line(cls, line):
+        line = line.strip()
+        if not line or line.startswith(("!", "#", "[")): return None, False
+        is_exception = line.startswith("@@")
+        if is_exception: line = line[2:]
+        if line.startswith("||"):
+            rule, _, options = line[2:].partition("$")
+            if options or not rule.endswith("^"): return None, False
+            domain = rule[:-1]
+            if any(c in domain for c in "/*^|"): return None, False
+            return cls.normalize(domain), is_exception
+        if is_exception: return None, False
+        parts = line.split("#", 1)[0].split()
+        if len(parts) == 1 and "." in parts[0] and "/" not in parts[0]: return cls.normalize(parts[0]), False
+        if len(parts) >= 2 and parts[0] in ("0.0.0.0", "127.0.0.1", "::", "::1"):
+            domain = cls.normalize(parts[1])
+            if domain not in cls.HOSTS_IGNORED: return domain, False
+        return None, False
+
+    @classmethod
+    def suffixes(cls, host):
+        labels = cls.normalize(host).split(".")
+        for i in range(len(labels)):
+            yield ".".join(labels[i:])
+
+    def matches(self, host):
+        domains, exceptions = self.domains, self.exceptions
+        blocked = False
+        for suffix in self.suffixes(host):
+            if suffix in exceptions: return False
+            if suffix in domains: blocked = True
+        return blocked
+
+class PublicSuffixList:
+    # Qt 6 has no public API for this, so the list the distribution ships for libpsl is read instead
+    SYSTEM_PATHS = ("/usr/share/publicsuffix/public_suffix_list.dat", "/usr/share/publicsuffix/effective_tld_names.dat")
+    # Without a system list only these common multi-label suffixes are known; other ones fall back to the last two labels
+    FALLBACK_RULES = (
+        "co.uk", "org.uk", "me.uk", "ltd.uk", "plc.uk", "net.uk", "ac.uk", "gov.uk", "nhs.uk", "sch.uk", "com.au", "net.au", "org.au", "edu.au",
+        "gov.au", "co.nz", "org.nz", "net.nz", "co.jp", "ne.jp", "or.jp", "ac.jp", "go.jp", "co.kr", "or.kr", "com.cn", "net.cn", "org.cn",
+        "com.tw", "com.hk", "com.sg", "com.my", "co.in", "net.in", "org.in", "co.id", "co.th", "com.br", "net.br", "org.br", "com.ar", "com.mx",
+        "com.tr", "co.za", "org.za", "co.il", "com.ua", "com.pl", "github.io", "blogspot.com", "herokuapp.com", "appspot.com",
+    )
+    _default = None
+
+    def __init__(self, lines):
+        self.rules, self.wildcards, self.exceptions = set(), set(), set()
+        for line in lines:
+            rule = line.split("//", 1)[0].strip().lower()
+            if not rule: continue
+            if rule.startswith("!"): self.exceptions.add(rule[1:])
+            elif rule.startswith("*."): self.wildcards.add(rule[2:])
+            else: self.rules.add(rule)
+
+    @classmethod
+    def default(cls):
+        if cls._default is None:
+            for file_name in cls.SYSTEM_PATHS:
+                try:
+                    with open(file_name, "r", encoding="utf-8") as f: cls._default = cls(f); break
+                except OSError: continue
+            else: cls._default = cls(cls.FALLBACK_RULES)
+        return cls._default
+
+    @functools.lru_cache(maxsize=4096)
+    def base_domain(self, host):
+        host = host.strip(".").lower()
+        if ":" in host or host.replace(".", "").isdigit(): return host
+        labels = host.split(".")
+        for i in range(len(labels)):
+            suffix = ".".join(labels[i:])
+            # Longest match first; an exception rule makes its parent the public suffix
+            if suffix in self.exceptions: public = i + 1; break
+            if suffix in self.rules or (i + 1 < len(labels) and ".".join(labels[i + 1:]) in self.wildcards): public = i; break
+        else: public = len(labels) - 1
+        return ".".join(labels[max(public - 1, 0):])
+
+class UrlFilter:
+    __slots__ = ("pattern", "is_exception", "is_regex", "start_anchor", "end_anchor", "match_case",
+                 "types", "excluded_types", "third_party", "include_domains", "exclude_domains", "matcher")
+    RESOURCE_TYPES = {"script", "image", "stylesheet", "object", "xmlhttprequest", "subdocument", "media",
+                      "font", "ping", "websocket", "document", "other"}
+    TYPE_ALIASES = {"xhr": "xmlhttprequest", "frame": "subdocument", "css": "stylesheet", "doc": "document"}
+    IGNORED_OPTIONS = {"important", "match-case", "all"}
+    OPTIONS_RE = re.compile(r"[\w~,=|.*-]+")
+    TOKEN_RE = re.compile(r"[a-z0-9%]{2,}")
+
+    def __init__(self, pattern, is_exception=False):
+        self.pattern, self.is_exception = pattern, is_exception
+        self.is_regex = len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/")
+        self.start_anchor = self.end_anchor = ""
+        if not self.is_regex:
+            if pattern.startswith("||"): self.start_anchor, pattern = "||", pattern[2:]
+            elif pattern.startswith("|"): self.start_anchor, pattern = "|", pattern[1:]
+            if pattern.endswith("|"): self.end_anchor, pattern = "|", pattern[:-1]
+            self.pattern = pattern
+        self.match_case = False
+        self.types, self.excluded_types = None, set()
+        self.third_party = None
+        self.include_domains, self.exclude_domains = None, None
+        self.matcher = None
+
+    @classmethod
+    def parse(cls, line):
+        line = line.strip()
+        if not line or line.startswith(("!", "[")) or "##" in line or "#@#" in line or "#?#" in line: return None
+        is_exception = line.startswith("@@")
+        if is_exception: line = line[2:]
+        options = ""
+        dollar = line.rfind("$")
+        if dollar > 0 and not (line.startswith("/") and line.endswith("/")) and cls.OPTIONS_RE.fullmatch(line[dollar + 1:]):
+            line, options = line[:dollar], line[dollar + 1:]
+        if not line or line in ("*", "|", "||"): return None
+        rule = cls(line.lower() if "match-case" not in options else line, is_exception)
+        for option in filter(None, options.split(",")):
+            negated = option.startswith("~")
+            name, _, value = option.lstrip("~").partition("=")
+            name = cls.TYPE_ALIASES.get(name, name)
+            if name in cls.RESOURCE_TYPES:
+                if negated: rule.excluded_types.add(name)
+                else: rule.types = (rule.types or set()) | {name}
+            elif name in ("third-party", "3p"): rule.third_party = not negated
+            elif name in ("first-party", "1p"): rule.third_party = negated
+            elif name == "domain" and value:
+                for domain in value.lower().split("|"):
+                    if domain.startswith("~"): rule.exclude_domains = (rule.exclude_domains or set()) | {domain[1:]}
+                    else: rule.include_domains = (rule.include_domains or set()) | {domain}
+            elif name == "match-case": rule.match_case = True
+            elif name not in cls.IGNORED_OPTIONS: return None
+        return rule
+
+    def tokens(self):
+        if self.is_regex: return []
+        pattern = self.pattern.lower()
+        tokens = []
+        for m in self.TOKEN_RE.finditer(pattern):
+            start, end = m.span()
+            if (start == 0 and not self.start_anchor) or (start > 0 and pattern[start - 1] == "*"): continue
+            if (end == len(pattern) and not self.end_anchor) or (end < len(pattern) and pattern[end] == "*"): continue
+            tokens.append(m.group())
+        return tokens
+
+    def compile(self):
+        if self.is_regex:
+            return re.compile(self.pattern[1:-1], 0 if self.match_case else re.IGNORECASE).search
+        if not self.start_anchor and not self.end_anchor and not any(c in self.pattern for c in "*^"):
+            # Plain substrings are by far the most common rule shape and need no regex at all
+            return lambda url, substring=self.pattern: substring in url
+        body = "".join(".*" if c == "*" else r"(?:[^\w.%-]|$)" if c == "^" else re.escape(c) for c in self.pattern)
+        start = {"||": r"^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?", "|": "^"}.get(self.start_anchor, "")
+        return re.compile(start + body + ("$" if self.end_anchor else "")).search
+
+    @staticmethod
+    def domain_matches(host, domains):
+        return any(suffix in domains for suffix in DomainBlocklist.suffixes(host))
+
+    def matches(self, url, lower_url, resource_type, first_party_host, is_third_party):
+        if self.types is not None and resource_type not in self.types: return False
+        if resource_type in self.excluded_types: return False
+        if self.third_party is not None and self.third_party != is_third_party: return False
+        if self.include_domains is not None and not self.domain_matches(first_party_host, self.include_domains): return False
+        if self.exclude_domains is not None and self.domain_matches(first_party_host, self.exclude_domains): return False
+        if self.matcher is None: self.matcher = self.compile()
+        return bool(self.matcher(url if self.match_case else lower_url))
+
+class UrlFilterIndex:
+    def __init__(self, rules=()):
+        self.block_index, self.block_untokenized = {}, []
+        self.exception_index, self.exception_untokenized = {}, []
+        rules = list(rules)
+        frequency = {}
+        rule_tokens = [rule.tokens() for rule in rules]
+        for tokens in rule_tokens:
+            for token in tokens: frequency[token] = frequency.get(token, 0) + 1
+        for rule, tokens in zip(rules, rule_tokens):
+            index, untokenized = (self.exception_index, self.exception_untokenized) if rule.is_exception else (self.block_index, self.block_untokenized)
+            if tokens: index.setdefault(min(tokens, key=lambda t: (frequency[t], -len(t))), []).append(rule)
+            else: untokenized.append(rule)
+        self.rule_count = len(rules)
+
+    def __len__(self): return self.rule_count
+
+    @classmethod
+    def from_lines(cls, lines):
+        return cls(filter(None, map(UrlFilter.parse, lines)))
+
+    @staticmethod
+    def base_domain(host):
+        return PublicSuffixList.default().base_domain(host)
+
+    def find(self, index, untokenized, tokens, args):
+        for token in tokens:
+            for rule in index.get(token, ()):
+                if rule.matches(*args): return rule
+        for rule in untokenized:
+            if rule.matches(*args): return rule
+        return None
+
+    def matches(self, url, host, resource_type="other", first_party_host="", domain_blocked=False):
+        if not self.rule_count: return domain_blocked
+        lower_url = url.lower()
+        tokens = set(UrlFilter.TOKEN_RE.findall(lower_url))
+        is_third_party = bool(first_party_host) and self.base_domain(host) != self.base_domain(first_party_host)
+        args = (url, lower_url, resource_type, first_party_host, is_third_party)
+        if not domain_blocked and not self.find(self.block_index, self.block_untokenized, tokens, args): return False
+        return not self.find(self.exception_index, self.exception_untokenized, tokens, args)
+
+class CompiledBlocklist:
+    MAGIC = b"DBBL"
+    VERSION = 1
+    BUCKET_BITS = 16
+    HEADER = struct.Struct("<4sIIII")
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        with open(file_name, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, bucket_bits, domain_count, exception_count = self.HEADER.unpack_from(self.map, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{file_name} is not a compatible blocklist snapshot")
+        self.bucket_shift = 64 - bucket_bits
+        self.view = memoryview(self.map)
+        start = self.HEADER.size
+        end = start + ((1 << bucket_bits) + 1) * 4
+        self.offsets = self.view[start:end].cast("I")
+        start, end = end, end + domain_count * 8
+        self.domain_hashes = self.view[start:end].cast("Q")
+        self.exception_hashes = self.view[end:end + exception_count * 8].cast("Q")
+
+    def __len__(self): return len(self.domain_hashes)
+
+    def close(self):
+        for view in (self.offsets, self.domain_hashes, self.exception_hashes, self.view): view.release()
+        self.map.close()
+
+    @staticmethod
+    def hash_domain(domain):
+        return int.from_bytes(hashlib.blake2b(domain.encode(), digest_size=8).digest(), "little")
+
+    @classmethod
+    def write(cls, file_name, domain_hashes, exception_hashes=()):
+        domain_hashes = array.array("Q", sorted(set(domain_hashes)))
+        exception_hashes = array.array("Q", sorted(set(exception_hashes)))
+        bucket_shift = 64 - cls.BUCKET_BITS
+        offsets = array.array("I", [0]) * ((1 << cls.BUCKET_BITS) + 1)
+        for h in domain_hashes: offsets[(h >> bucket_shift) + 1] += 1
+        for i in range(1, len(offsets)): offsets[i] += offsets[i - 1]
+        tmp_name = file_name + ".tmp"
+        with open(tmp_name, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, cls.BUCKET_BITS, len(domain_hashes), len(exception_hashes)))
+            f.write(offsets.tobytes()); f.write(domain_hashes.tobytes()); f.write(exception_hashes.tobytes())
+        os.replace(tmp_name, file_name)
+
+    def contains(self, hashes, h, lo=0, hi=None):
+        hi = len(hashes) if hi is None else hi
+        i = bisect.bisect_left(hashes, h, lo, hi)
+        return i < hi and hashes[i] == h
+
+    def matches(self, host):
+        blocked = False
+        for suffix in DomainBlocklist.suffixes(host):
+            h = self.hash_domain(suffix)
+            if self.exception_hashes and self.contains(self.exception_hashes, h): return False
+            bucket = h >> self.bucket_shift
+            if not blocked and self.contains(self.domain_hashes, h, self.offsets[bucket], self.offsets[bucket + 1]): blocked = True
+        return blocked
+
+class BlocklistCompiler:
+    MANIFEST_NAME = "blocklist.json"
+    BUILTIN_SOURCE = ":builtin:"
+    VERSION = 2
+
+    def __init__(self, cache_dir, builtin_domains=()):
+        self.cache_dir = cache_dir
+        self.builtin_domains = tuple(builtin_domains)
+        self.lock = threading.Lock()
+        self.manifest = self.read_manifest()
+        self.warnings = []
+
+    def read_manifest(self):
+        try:
+            with open(os.path.join(self.cache_dir, self.MANIFEST_NAME), "r") as f: return json.load(f)
+        except (OSError, ValueError): return {"sources": {}, "snapshot": None}
+
+    def write_manifest(self):
+        file_name = os.path.join(self.cache_dir, self.MANIFEST_NAME)
+        with open(file_name + ".tmp", "w") as f: json.dump(self.manifest, f, indent=4)
+        os.replace(file_name + ".tmp", file_name)
+
+    def fingerprint(self, source):
+        # The version is part of every fingerprint so that parts compiled by an older format get rebuilt
+        if source == self.BUILTIN_SOURCE:
+            return f"{self.VERSION}:" + hashlib.blake2b("\n".join(self.builtin_domains).encode(), digest_size=8).hexdigest()
+        stat = os.stat(source)
+        return f"{self.VERSION}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def sources(self):
+        return [s for s in self.manifest["sources"] if s != self.BUILTIN_SOURCE]
+
+    def current_fingerprint(self, source, entry):
+        try: return self.fingerprint(source), False
+        except OSError:
+            # A source file that has gone away keeps its last compiled rules instead of silently dropping them
+            kept = entry and all(os.path.exists(os.path.join(self.cache_dir, entry.get(name) or "")) for name in ("part", "rules"))
+            return (entry["fingerprint"] if kept else None), True
+
+    def is_current(self):
+        if not self.manifest["snapshot"] or not os.path.exists(os.path.join(self.cache_dir, self.manifest["snapshot"])): return False
+        for source, entry in self.manifest["sources"].items():
+            # A source that has just gone missing takes one compile to be reported, later starts stay quiet
+            if self.current_fingerprint(source, entry) != (entry["fingerprint"], entry.get("missing", False)): return False
+        return True
+
+    def open_snapshot(self):
+        if not self.manifest["snapshot"]: return None
+        try: return CompiledBlocklist(os.path.join(self.cache_dir, self.manifest["snapshot"]))
+        except (OSError, ValueError): return None
+
+    def compile_source(self, source, file_name, rules_name):
+        domains, exceptions, rules = set(self.builtin_domains if source == self.BUILTIN_SOURCE else ()), set(), []
+        if source != self.BUILTIN_SOURCE:
+            with open(source, "r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    domain, is_exception = DomainBlocklist.parse_line(line)
+                    if domain:
+                        (exceptions if is_exception else domains).add(domain)
+                        # Domain exceptions also have to override path rules, which only consult the exception index
+                        if is_exception: rules.append(f"@@||{domain}^")
+                    # Hosts-file entries that parse_line skips on purpose (localhost, broadcasthost, ...) are not URL rules
+                    elif len(line.split()) == 1 and not line.lstrip().startswith("#") and UrlFilter.parse(line): rules.append(line.strip())
+        CompiledBlocklist.write(file_name, map(CompiledBlocklist.hash_domain, domains), map(CompiledBlocklist.hash_domain, exceptions))
+        with open(rules_name, "w", encoding="utf-8") as f: f.write("\n".join(rules))
+
+    def compile(self, sources=None):
+        with self.lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            sources = [self.BUILTIN_SOURCE] + [s for s in (sources if sources is not None else self.sources()) if s != self.BUILTIN_SOURCE]
+            old_entries = self.manifest["sources"]
+            entries, parts, self.warnings = {}, [], []
+            for source in sources:
+                entry = old_entries.get(source)
+                fingerprint, missing = self.current_fingerprint(source, entry)
+                if fingerprint is None:
+                    self.warnings.append(f"Blocklist source {source} is missing and has no compiled rules, dropping it"); continue
+                if missing and not entry.get("missing"): self.warnings.append(f"Blocklist source {source} is missing, keeping the rules compiled from it before")
+                key = "source-" + hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+                part_path, rules_path = os.path.join(self.cache_dir, key + ".bin"), os.path.join(self.cache_dir, key + ".rules")
+                if not entry or entry["fingerprint"] != fingerprint or not os.path.exists(part_path) or not os.path.exists(rules_path):
+                    self.compile_source(source, part_path, rules_path)
+                entries[source] = {"fingerprint": fingerprint, "part": key + ".bin", "rules": key + ".rules"}
+                if missing: entries[source]["missing"] = True
+                parts.append(CompiledBlocklist(part_path))
+            domain_hashes = set().union(*(part.domain_hashes for part in parts))
+            exception_hashes = set().union(*(part.exception_hashes for part in parts))
+            for part in parts: part.close()
+            digest = hashlib.blake2b(json.dumps(entries, sort_keys=True).encode(), digest_size=8).hexdigest()
+            snapshot_name = f"blocklist-{digest}.bin"
+            CompiledBlocklist.write(os.path.join(self.cache_dir, snapshot_name), domain_hashes, exception_hashes)
+            self.manifest = {"sources": entries, "snapshot": snapshot_name}
+            self.write_manifest()
+            self.remove_stale_files()
+            return CompiledBlocklist(os.path.join(self.cache_dir, snapshot_name))
+
+    def remove_stale_files(self):
+        keep = {self.MANIFEST_NAME, self.manifest["snapshot"]}
+        for entry in self.manifest["sources"].values(): keep |= {entry["part"], entry.get("rules")}
+        for name in os.listdir(self.cache_dir):
+            if name in keep or not name.endswith((".bin", ".rules")): continue
+            # Snapshots still mapped by a running interceptor cannot be unlinked on Windows, they go on the next compile
+            try: os.remove(os.path.join(self.cache_dir, name))
+            except OSError: pass
+
+    def load_url_filters(self):
+        lines = []
+        for entry in self.manifest["sources"].values():
+            if not entry.get("rules"): continue
+            try:
+                with open(os.path.join(self.cache_dir, entry["rules"]), "r", encoding="utf-8") as f: lines.extend(f.read().splitlines())
+            except OSError: pass
+        return UrlFilterIndex.from_lines(lines)
+
+    def add_source(self, source):
+        return self.compile(self.sources() + [os.path.abspath(source)])
+
+class RequestCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    @staticmethod
+    def origin(qurl):
+        port = qurl.port()
+        return f"{qurl.scheme()}://{qurl.host()}" + (f":{port}" if port != -1 else "")
+
+    def record(self, origin, host, blocked):
+        with self.lock:
+            entry = self.counts.get(origin)
+            if entry is None: entry = self.counts[origin] = [0, 0, collections.Counter()]
+            if blocked: entry[1] += 1; entry[2][host] += 1
+            else: entry[0] += 1
+
+    def totals(self):
+        with self.lock: return {origin: (entry[0], entry[1]) for origin, entry in self.counts.items()}
+
+    def snapshot(self, top_hosts=3):
+        with self.lock: entries = [(origin, entry[0], entry[1], entry[2].most_common(top_hosts)) for origin, entry in self.counts.items()]
+        return sorted(entries, key=lambda entry: (-entry[2], -entry[1], entry[0]))
+
+    def export(self, top_hosts=10):
+        return [{"origin": origin, "allowed_requests": allowed, "blocked_requests": blocked, "top_blocked_hosts": dict(hosts)}
+                for origin, allowed, blocked, hosts in self.snapshot(top_hosts)]
+
+    def clear(self):
+        with self.lock: self.counts.clear()
+
 class AdBlockInterceptor(QWebEngineUrlRequestInterceptor):
-    def __init__(self, parent=None):
+    DEFAULT_AD_DOMAINS = (
+        "doubleclick.net", "adservice.google.com", "googlesyndication.com",
+        "ad.doubleclick.net", "google-analytics.com", "c.amazon-adsystem.com",
+        "pagead2.googlesyndication.com", "tpc.googlesyndication.com",
+    )
+
+    RESOURCE_TYPES = {
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeMainFrame: "document",
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeSubFrame: "subdocument",
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeStylesheet: "stylesheet",
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeScript: "script",
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeImage: "image",
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeFontResource: "font",
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeObject: "object",
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeMedia: "media",
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeXhr: "xmlhttprequest",
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypePing: "ping",
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypePluginResource: "object",
+    }
+
+    def __init__(self, blocklist=None, url_filters=None, parent=None):
         super().__init__(parent)
-        self.ad_domains = {
-            "doubleclick.net", "adservice.google.com", "googlesyndication.com",
-            "ad.doubleclick.net", "google-analytics.com", "c.amazon-adsystem.com",
-            "pagead2.googlesyndication.com", "tpc.googlesyndication.com",
-        }
+        self.blocklist = blocklist if blocklist is not None else DomainBlocklist(self.DEFAULT_AD_DOMAINS)
+        self.url_filters = url_filters if url_filters is not None else UrlFilterIndex()
+        self.blocking = True
+        self.request_counter = RequestCounter()
+
+    def should_block(self, url, host, resource_type="other", first_party_host=""):
+        return self.url_filters.matches(url, host, resource_type, first_party_host, self.blocklist.matches(host))
 
     def interceptRequest(self, info):
-        url = info.requestUrl().host()
-        if any(domain in url for domain in self.ad_domains):
-            info.block(True)
+        request_url, first_party_url = info.requestUrl(), info.firstPartyUrl()
+        host, first_party_host = request_url.host(), first_party_url.host()
+        blocked = False
+        if self.blocking:
+            resource_type = self.RESOURCE_TYPES.get(info.resourceType(), "other")
+            if blocked := self.should_block(request_url.toString(), host, resource_type, first_party_host): info.block(True)
+        self.request_counter.record(RequestCounter.origin(first_party_url) if first_party_host else RequestCounter.origin(request_url), host, blocked)
+
+def format_bytes(size):
+    if size < 1024: return f"{size} B"
+    elif size < 1024**2: return f"{size/1024:.2f} KB"
+    elif size < 1024**3: return f"{size/1024**2:.2f} MB"
+    else: return f"{size/1024**3:.2f} GB"
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds < 60: return f"{seconds} s"
+    elif seconds < 3600: return f"{seconds // 60} min {seconds % 60} s"
+    else: return f"{seconds // 3600} h {seconds % 3600 // 60} min"
 
 class SettingsDialog(QDialog):
     theme_changed = Signal(str)
     custom_theme_path_selected = Signal(str)
     javascript_toggled = Signal(bool)
     adblock_toggled = Signal(bool)
+    blocklist_file_selected = Signal(str)
     homepage_changed = Signal(str)
+    tab_discard_minutes_changed = Signal(int)
+    tab_memory_budget_changed = Signal(int)
+    speculation_toggled = Signal(bool)
+    speculation_pages_changed = Signal(int)
+    speculation_memory_changed = Signal(int)
+    segmented_downloads_toggled = Signal(bool)
+    max_active_downloads_changed = Signal(int)
+    download_segments_changed = Signal(int)
+    download_rate_limit_changed = Signal(int)
+    per_download_rate_limit_changed = Signal(int)
     clear_data_requested = Signal()
+    cache_mode_changed = Signal(str, str)
+    cache_size_changed = Signal(str, int)
+    container_added = Signal(str)
+    container_removed = Signal(str)
 
     def __init__(self, parent):
         super().__init__(parent)
@@ -88,6 +625,7 @@ class SettingsDialog(QDialog):
         self.setup_appearance_tab()
         self.setup_privacy_tab()
         self.setup_general_tab()
+        self.setup_downloads_tab()
 
         close_button = QPushButton("Close")
         close_button.clicked.connect(self.accept)
@@ -124,10 +662,32 @@ class SettingsDialog(QDialog):
 
         self.js_checkbox = QCheckBox("Enable JavaScript")
         self.adblock_checkbox = QCheckBox("Enable Basic Ad Blocker")
-        clear_data_button = QPushButton("Clear Browse Data...")
+        import_blocklist_button = QPushButton("Import Blocklist...")
+        clear_data_button = QPushButton("Site Data && Cache...")
+
+        cache_group = QGroupBox("Containers && HTTP Cache")
+        cache_layout = QVBoxLayout(cache_group)
+        container_layout = QHBoxLayout()
+        container_label = QLabel("Container:")
+        self.container_combo = QComboBox()
+        add_container_button = QPushButton("Add..."); self.remove_container_button = QPushButton("Remove")
+        container_layout.addWidget(container_label); container_layout.addWidget(self.container_combo, 1)
+        container_layout.addWidget(add_container_button); container_layout.addWidget(self.remove_container_button)
+        cache_mode_layout = QHBoxLayout()
+        cache_mode_label = QLabel("Cache mode:")
+        self.cache_mode_combo = QComboBox(); self.cache_mode_combo.addItems(["Memory", "Disk", "Off"])
+        cache_mode_layout.addWidget(cache_mode_label); cache_mode_layout.addWidget(self.cache_mode_combo)
+        cache_size_layout = QHBoxLayout()
+        cache_size_label = QLabel("Disk cache size (MB, 0 = automatic):")
+        self.cache_size_spin = QSpinBox(); self.cache_size_spin.setRange(0, 64 * 1024); self.cache_size_spin.setSingleStep(64)
+        cache_size_layout.addWidget(cache_size_label); cache_size_layout.addWidget(self.cache_size_spin)
+        cache_layout.addLayout(container_layout); cache_layout.addLayout(cache_mode_layout); cache_layout.addLayout(cache_size_layout)
+        self.containers = {}
         
         layout.addWidget(self.js_checkbox)
         layout.addWidget(self.adblock_checkbox)
+        layout.addWidget(import_blocklist_button)
+        layout.addWidget(cache_group)
         layout.addStretch()
         layout.addWidget(clear_data_button)
         
@@ -135,7 +695,46 @@ class SettingsDialog(QDialog):
         
         self.js_checkbox.toggled.connect(self.javascript_toggled.emit)
         self.adblock_checkbox.toggled.connect(self.adblock_toggled.emit)
+        import_blocklist_button.clicked.connect(self.load_blocklist_file)
         clear_data_button.clicked.connect(self.clear_data_requested.emit)
+        self.container_combo.currentTextChanged.connect(self.show_container)
+        add_container_button.clicked.connect(self.add_container)
+        self.remove_container_button.clicked.connect(lambda: self.container_removed.emit(self.container_combo.currentText()))
+        self.cache_mode_combo.currentTextChanged.connect(self.on_cache_mode_changed)
+        self.cache_size_spin.valueChanged.connect(self.on_cache_size_changed)
+
+    def set_containers(self, containers):
+        current = self.container_combo.currentText()
+        self.containers = dict(containers)
+        self.container_combo.blockSignals(True)
+        self.container_combo.clear(); self.container_combo.addItems(list(self.containers))
+        self.container_combo.setCurrentText(current if current in self.containers else ProfileManager.DEFAULT)
+        self.container_combo.blockSignals(False)
+        self.show_container(self.container_combo.currentText())
+
+    def show_container(self, name):
+        if name not in self.containers: return
+        mode, size_mb = self.containers[name]
+        self.remove_container_button.setEnabled(name != ProfileManager.DEFAULT)
+        for widget in (self.cache_mode_combo, self.cache_size_spin): widget.blockSignals(True)
+        self.cache_mode_combo.setCurrentText(mode.capitalize())
+        self.cache_size_spin.setValue(size_mb); self.cache_size_spin.setEnabled(mode == "disk")
+        for widget in (self.cache_mode_combo, self.cache_size_spin): widget.blockSignals(False)
+
+    def add_container(self):
+        name, ok = QInputDialog.getText(self, "Add Container", "Container name:")
+        if ok and name.strip(): self.container_added.emit(name.strip())
+
+    def on_cache_mode_changed(self, mode):
+        self.cache_size_spin.setEnabled(mode == "Disk")
+        name = self.container_combo.currentText()
+        if name in self.containers: self.containers[name] = (mode.lower(), self.containers[name][1])
+        self.cache_mode_changed.emit(name, mode.lower())
+
+    def on_cache_size_changed(self, size_mb):
+        name = self.container_combo.currentText()
+        if name in self.containers: self.containers[name] = (self.containers[name][0], size_mb)
+        self.cache_size_changed.emit(name, size_mb)
 
     def setup_general_tab(self):
         general_tab = QWidget()
@@ -146,13 +745,86 @@ class SettingsDialog(QDialog):
         self.homepage_edit = QLineEdit()
         homepage_layout.addWidget(homepage_label)
         homepage_layout.addWidget(self.homepage_edit)
+
+        tabs_group = QGroupBox("Background Tabs")
+        tabs_layout = QVBoxLayout(tabs_group)
+        discard_layout = QHBoxLayout()
+        discard_label = QLabel("Unload tabs idle for (minutes, 0 = never):")
+        self.discard_spin = QSpinBox(); self.discard_spin.setRange(0, 24 * 60)
+        discard_layout.addWidget(discard_label); discard_layout.addWidget(self.discard_spin)
+        budget_layout = QHBoxLayout()
+        budget_label = QLabel("Unload tabs above memory use (MB, 0 = no limit):")
+        self.memory_budget_spin = QSpinBox(); self.memory_budget_spin.setRange(0, 1024 * 1024); self.memory_budget_spin.setSingleStep(256)
+        budget_layout.addWidget(budget_label); budget_layout.addWidget(self.memory_budget_spin)
+        tabs_layout.addLayout(discard_layout); tabs_layout.addLayout(budget_layout)
+
+        speculation_group = QGroupBox("Preloading")
+        speculation_layout = QVBoxLayout(speculation_group)
+        self.speculation_checkbox = QCheckBox("Preload hovered bookmarks and strong address bar matches")
+        pages_layout = QHBoxLayout()
+        pages_label = QLabel("Pages preloaded at once:")
+        self.speculation_pages_spin = QSpinBox(); self.speculation_pages_spin.setRange(1, 8)
+        pages_layout.addWidget(pages_label); pages_layout.addWidget(self.speculation_pages_spin)
+        speculation_memory_layout = QHBoxLayout()
+        speculation_memory_label = QLabel("Memory for preloaded pages (MB):")
+        self.speculation_memory_spin = QSpinBox(); self.speculation_memory_spin.setRange(32, 16 * 1024); self.speculation_memory_spin.setSingleStep(64)
+        speculation_memory_layout.addWidget(speculation_memory_label); speculation_memory_layout.addWidget(self.speculation_memory_spin)
+        speculation_layout.addWidget(self.speculation_checkbox); speculation_layout.addLayout(pages_layout); speculation_layout.addLayout(speculation_memory_layout)
         
         layout.addLayout(homepage_layout)
+        layout.addWidget(tabs_group)
+        layout.addWidget(speculation_group)
         layout.addStretch()
 
         self.tab_widget.addTab(general_tab, "General")
 
         self.homepage_edit.textChanged.connect(self.homepage_changed.emit)
+        self.discard_spin.valueChanged.connect(self.tab_discard_minutes_changed.emit)
+        self.memory_budget_spin.valueChanged.connect(self.tab_memory_budget_changed.emit)
+        self.speculation_checkbox.toggled.connect(self.speculation_toggled.emit)
+        self.speculation_pages_spin.valueChanged.connect(self.speculation_pages_changed.emit)
+        self.speculation_memory_spin.valueChanged.connect(self.speculation_memory_changed.emit)
+
+    def setup_downloads_tab(self):
+        downloads_tab = QWidget()
+        layout = QVBoxLayout(downloads_tab)
+
+        self.segmented_checkbox = QCheckBox("Use the built-in segmented downloader for HTTP(S) files")
+
+        max_active_layout = QHBoxLayout()
+        max_active_label = QLabel("Simultaneous downloads:")
+        self.max_active_spin = QSpinBox(); self.max_active_spin.setRange(1, 32)
+        max_active_layout.addWidget(max_active_label); max_active_layout.addWidget(self.max_active_spin)
+
+        segments_layout = QHBoxLayout()
+        segments_label = QLabel("Connections per download:")
+        self.segments_spin = QSpinBox(); self.segments_spin.setRange(1, 16)
+        segments_layout.addWidget(segments_label); segments_layout.addWidget(self.segments_spin)
+
+        rate_limit_layout = QHBoxLayout()
+        rate_limit_label = QLabel("Total speed limit (KB/s, 0 = unlimited):")
+        self.rate_limit_spin = QSpinBox(); self.rate_limit_spin.setRange(0, 1024 * 1024)
+        rate_limit_layout.addWidget(rate_limit_label); rate_limit_layout.addWidget(self.rate_limit_spin)
+
+        per_download_rate_layout = QHBoxLayout()
+        per_download_rate_label = QLabel("Per-download speed limit (KB/s, 0 = unlimited):")
+        self.per_download_rate_spin = QSpinBox(); self.per_download_rate_spin.setRange(0, 1024 * 1024)
+        per_download_rate_layout.addWidget(per_download_rate_label); per_download_rate_layout.addWidget(self.per_download_rate_spin)
+
+        layout.addWidget(self.segmented_checkbox)
+        layout.addLayout(max_active_layout)
+        layout.addLayout(segments_layout)
+        layout.addLayout(rate_limit_layout)
+        layout.addLayout(per_download_rate_layout)
+        layout.addStretch()
+
+        self.tab_widget.addTab(downloads_tab, "Downloads")
+
+        self.segmented_checkbox.toggled.connect(self.segmented_downloads_toggled.emit)
+        self.max_active_spin.valueChanged.connect(self.max_active_downloads_changed.emit)
+        self.segments_spin.valueChanged.connect(self.download_segments_changed.emit)
+        self.rate_limit_spin.valueChanged.connect(self.download_rate_limit_changed.emit)
+        self.per_download_rate_spin.valueChanged.connect(self.per_download_rate_limit_changed.emit)
 
     def on_theme_selection_changed(self, theme_name):
         self.load_custom_button.setEnabled(theme_name == "Custom")
@@ -164,61 +836,1504 @@ class SettingsDialog(QDialog):
         if file_path:
             self.custom_theme_path_selected.emit(file_path)
             
-    def set_initial_values(self, js_enabled, adblock_enabled, homepage, current_theme):
+    def load_blocklist_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Blocklist", "", "Blocklists (*.txt *.hosts hosts);;All Files (*)")
+        if file_path:
+            self.blocklist_file_selected.emit(file_path)
+
+    def set_initial_values(self, js_enabled, adblock_enabled, homepage, current_theme, discard_minutes=0, memory_budget_mb=0,
+                           containers=None, download_settings=None, speculation_settings=None):
         self.js_checkbox.setChecked(js_enabled)
         self.adblock_checkbox.setChecked(adblock_enabled)
         self.homepage_edit.setText(homepage)
         self.theme_combo.setCurrentText(current_theme.capitalize())
+        self.discard_spin.setValue(discard_minutes)
+        self.memory_budget_spin.setValue(memory_budget_mb)
+        self.set_containers(containers or {ProfileManager.DEFAULT: ("disk", 256)})
+        if download_settings:
+            segmented, max_active, segments, rate_limit_kb, per_download_kb = download_settings
+            self.segmented_checkbox.setChecked(segmented); self.max_active_spin.setValue(max_active)
+            self.segments_spin.setValue(segments); self.rate_limit_spin.setValue(rate_limit_kb); self.per_download_rate_spin.setValue(per_download_kb)
+        if speculation_settings:
+            enabled, max_pages, memory_cap_mb = speculation_settings
+            self.speculation_checkbox.setChecked(enabled); self.speculation_pages_spin.setValue(max_pages); self.speculation_memory_spin.setValue(memory_cap_mb)
+
+class HistoryDialog(QDialog):
+    url_activated = Signal(str)
+    clear_history_requested = Signal()
+    results_ready = Signal(int, list)
+
+    def __init__(self, parent, history, executor):
+        super().__init__(parent)
+        self.setWindowTitle("History")
+        self.resize(700, 500)
+        self.history, self.executor = history, executor
+        self.query_generation = 0
+
+        layout = QVBoxLayout(self)
+        self.search_edit = QLineEdit(); self.search_edit.setPlaceholderText("Search history...")
+        self.results_list = QListWidget()
+        clear_button = QPushButton("Clear History...")
+        layout.addWidget(self.search_edit); layout.addWidget(self.results_list)
+        layout.addWidget(clear_button, 0, Qt.AlignmentFlag.AlignRight)
+
+        self.search_timer = QTimer(self); self.search_timer.setSingleShot(True); self.search_timer.setInterval(150)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        self.search_timer.timeout.connect(self.refresh)
+        self.results_ready.connect(self.show_results)
+        self.results_list.itemActivated.connect(lambda item: self.url_activated.emit(item.data(Qt.ItemDataRole.UserRole)))
+        clear_button.clicked.connect(self.clear_history_requested.emit)
+
+    def refresh(self):
+        self.query_generation += 1
+        self.executor.submit(self._search, self.query_generation, self.search_edit.text())
+
+    def _search(self, generation, text):
+        try: self.results_ready.emit(generation, self.history.search(text, 200))
+        except sqlite3.Error: self.results_ready.emit(generation, [])
+
+    def show_results(self, generation, rows):
+        if generation != self.query_generation: return
+        self.results_list.clear()
+        for url, title, visit_count, last_visit in rows:
+            item = QListWidgetItem(f"{title or url}\n{url}"); item.setData(Qt.ItemDataRole.UserRole, url)
+            self.results_list.addItem(item)
+
+class SiteDataDialog(QDialog):
+    refresh_requested = Signal()
+    clear_origins_requested = Signal(list)
+    clear_cache_requested = Signal()
+    clear_all_requested = Signal()
+    container_changed = Signal(str)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setWindowTitle("Site Data & Cache")
+        self.resize(500, 450)
+
+        layout = QVBoxLayout(self)
+        container_layout = QHBoxLayout()
+        container_label = QLabel("Container:")
+        self.container_combo = QComboBox()
+        container_layout.addWidget(container_label); container_layout.addWidget(self.container_combo, 1)
+        stats_group = QGroupBox("Cache Statistics")
+        stats_layout = QVBoxLayout(stats_group)
+        self.mode_label = QLabel(); self.size_label = QLabel(); self.hit_ratio_label = QLabel()
+        stats_layout.addWidget(self.mode_label); stats_layout.addWidget(self.size_label); stats_layout.addWidget(self.hit_ratio_label)
+
+        origins_group = QGroupBox("Sites with Cookies")
+        origins_layout = QVBoxLayout(origins_group)
+        self.origins_list = QListWidget()
+        self.origins_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        origins_layout.addWidget(self.origins_list)
+
+        buttons_layout = QHBoxLayout()
+        clear_selected_button = QPushButton("Clear Selected Sites")
+        clear_cache_button = QPushButton("Clear Cache")
+        clear_all_button = QPushButton("Clear Everything")
+        refresh_button = QPushButton("Refresh")
+        buttons_layout.addWidget(refresh_button); buttons_layout.addStretch(); buttons_layout.addWidget(clear_selected_button); buttons_layout.addWidget(clear_cache_button); buttons_layout.addWidget(clear_all_button)
+
+        layout.addLayout(container_layout); layout.addWidget(stats_group); layout.addWidget(origins_group); layout.addLayout(buttons_layout)
+
+        clear_selected_button.clicked.connect(lambda: self.clear_origins_requested.emit([item.text() for item in self.origins_list.selectedItems()]))
+        clear_cache_button.clicked.connect(self.clear_cache_requested.emit)
+        clear_all_button.clicked.connect(self.clear_all_requested.emit)
+        refresh_button.clicked.connect(self.refresh_requested.emit)
+        self.container_combo.currentTextChanged.connect(self.container_changed.emit)
+
+    def set_containers(self, names, current):
+        self.container_combo.blockSignals(True)
+        self.container_combo.clear(); self.container_combo.addItems(names); self.container_combo.setCurrentText(current)
+        self.container_combo.blockSignals(False)
+
+    def set_statistics(self, cache_mode, cache_bytes, hits, total):
+        self.mode_label.setText(f"Mode: {cache_mode.capitalize()}")
+        self.size_label.setText(f"Size on disk: {format_bytes(cache_bytes)}" if cache_mode == "disk" else "Size on disk: -")
+        ratio = f"{hits / total:.1%}" if total else "-"
+        self.hit_ratio_label.setText(f"Hit ratio: {ratio} ({hits} of {total} resources this session)")
+
+    def set_origins(self, origins):
+        self.origins_list.clear(); self.origins_list.addItems(sorted(origins))
+
+class MetricsPanel(QDockWidget):
+    export_requested = Signal(str, str)
+    clear_requested = Signal()
+    LOAD_COLUMNS = (
+        ("started_at", "Started"), ("title", "Page"), ("duration_ms", "Total (ms)"), ("ttfb_ms", "TTFB (ms)"),
+        ("dom_content_loaded_ms", "DCL (ms)"), ("load_event_ms", "Load (ms)"), ("first_contentful_paint_ms", "FCP (ms)"),
+        ("transfer_bytes", "Transfer"), ("allowed_requests", "Allowed"), ("blocked_requests", "Blocked"), ("blocking", "Blocking"),
+        ("speculative", "Preloaded"), ("url", "URL"),
+    )
+    ORIGIN_COLUMNS = ("Origin", "Allowed", "Blocked", "Blocked %", "Top Blocked Hosts")
+    MAX_ROWS = 1000
+
+    def __init__(self, parent, request_counter):
+        super().__init__("Page Metrics", parent)
+        self.request_counter = request_counter
+        widget = QWidget(); layout = QVBoxLayout(widget); layout.setContentsMargins(4, 4, 4, 4)
+        self.views = QTabWidget()
+        self.loads_model = QStandardItemModel(0, len(self.LOAD_COLUMNS), self)
+        self.loads_model.setHorizontalHeaderLabels([header for _, header in self.LOAD_COLUMNS])
+        self.origins_model = QStandardItemModel(0, len(self.ORIGIN_COLUMNS), self)
+        self.origins_model.setHorizontalHeaderLabels(list(self.ORIGIN_COLUMNS))
+        for model, label in ((self.loads_model, "Page Loads"), (self.origins_model, "Requests by Origin")):
+            view = QTableView(); view.setModel(model); view.setSortingEnabled(True); view.verticalHeader().hide()
+            view.setEditTriggers(QTableView.EditTrigger.NoEditTriggers); view.horizontalHeader().setStretchLastSection(True)
+            view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+            self.views.addTab(view, label)
+
+        buttons_layout = QHBoxLayout()
+        export_button = QPushButton("Export..."); clear_button = QPushButton("Clear")
+        self.speculation_label = QLabel()
+        buttons_layout.addWidget(self.speculation_label); buttons_layout.addStretch(); buttons_layout.addWidget(export_button); buttons_layout.addWidget(clear_button)
+        layout.addWidget(self.views); layout.addLayout(buttons_layout)
+        self.setWidget(widget)
+
+        self.refresh_timer = QTimer(self); self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.refresh_origins)
+        self.visibilityChanged.connect(lambda visible: self.refresh_timer.start() if visible else self.refresh_timer.stop())
+        self.views.currentChanged.connect(self.refresh_origins)
+        export_button.clicked.connect(self.choose_export_file)
+        clear_button.clicked.connect(self.clear_requested.emit)
+
+    @staticmethod
+    def make_item(value):
+        item = QStandardItem()
+        if isinstance(value, bool): item.setText("Yes" if value else "No")
+        elif value is not None: item.setData(value, Qt.ItemDataRole.DisplayRole)
+        return item
+
+    def add_load(self, load):
+        row = load.as_dict()
+        row["transfer_bytes"] = format_bytes(row["transfer_bytes"]) if row["transfer_bytes"] is not None else None
+        self.loads_model.appendRow([self.make_item(row[key]) for key, _ in self.LOAD_COLUMNS])
+        if self.loads_model.rowCount() > self.MAX_ROWS: self.loads_model.removeRow(0)
+
+    def refresh_origins(self):
+        if self.views.currentIndex() != 1 or not self.isVisible(): return
+        entries = self.request_counter.snapshot()
+        self.origins_model.setRowCount(len(entries))
+        for row, (origin, allowed, blocked, top_hosts) in enumerate(entries):
+            share = round(100 * blocked / (allowed + blocked), 1) if allowed + blocked else 0.0
+            hosts = ", ".join(f"{host} ({count})" for host, count in top_hosts)
+            for column, value in enumerate((origin, allowed, blocked, share, hosts)):
+                self.origins_model.setData(self.origins_model.index(row, column), value)
+
+    def set_speculation_stats(self, stats):
+        self.speculation_label.setText(f"Preloaded: {stats['started']}, used: {stats['hits']} swapped + {stats['warm']} warm "
+                                       f"({stats['hit_rate']:.0%}), saved {stats['saved_ms'] / 1000:.1f} s")
+
+    def clear(self):
+        self.loads_model.setRowCount(0); self.origins_model.setRowCount(0)
+
+    def choose_export_file(self):
+        file_name, selected_filter = QFileDialog.getSaveFileName(self, "Export Metrics", "", "JSON (*.json);;CSV (*.csv)")
+        if not file_name: return
+        if not file_name.lower().endswith((".json", ".csv")): file_name += ".csv" if selected_filter.startswith("CSV") else ".json"
+        self.export_requested.emit(file_name, "origins" if self.views.currentIndex() == 1 else "loads")
+
+class BrowserDownload:
+    STATES = {
+        QWebEngineDownloadRequest.State.DownloadRequested: "Queued",
+        QWebEngineDownloadRequest.State.DownloadInProgress: "Downloading",
+        QWebEngineDownloadRequest.State.DownloadCompleted: "Completed",
+        QWebEngineDownloadRequest.State.DownloadCancelled: "Cancelled",
+        QWebEngineDownloadRequest.State.DownloadInterrupted: "Failed",
+    }
 
-class DownloadItemWidget(QWidget):
     def __init__(self, download_item: QWebEngineDownloadRequest):
-        super().__init__()
         self.download_item = download_item
-        layout = QVBoxLayout(self); layout.setContentsMargins(5, 5, 5, 5)
-        self.filename_label = QLabel(download_item.suggestedFileName()); self.filename_label.setWordWrap(True)
-        self.progress_bar = QProgressBar(); self.status_label = QLabel("Initializing...")
-        layout.addWidget(self.filename_label); layout.addWidget(self.progress_bar); layout.addWidget(self.status_label)
-        download_item.receivedBytesChanged.connect(self.update_progress)
-        download_item.stateChanged.connect(self.update_state)
-
-    def format_bytes(self, size):
-        if size < 1024: return f"{size} B"
-        elif size < 1024**2: return f"{size/1024:.2f} KB"
-        elif size < 1024**3: return f"{size/1024**2:.2f} MB"
-        else: return f"{size/1024**3:.2f} GB"
-
-    def update_progress(self):
-        received = self.download_item.receivedBytes(); total = self.download_item.totalBytes()
-        if total > 0:
-            progress = int((received / total) * 100); self.progress_bar.setValue(progress)
-            self.status_label.setText(f"{self.format_bytes(received)} / {self.format_bytes(total)}")
-        else: self.status_label.setText(f"{self.format_bytes(received)}")
-
-    def update_state(self):
-        state = self.download_item.state()
-        if state == QWebEngineDownloadRequest.State.DownloadCompleted:
-            self.progress_bar.setValue(100); self.status_label.setText("Completed")
-        elif state == QWebEngineDownloadRequest.State.DownloadCancelled: self.status_label.setText("Cancelled")
-        elif state == QWebEngineDownloadRequest.State.DownloadInterrupted: self.status_label.setText(f"Failed: {self.download_item.interruptReasonString()}")
+        self.file_name = download_item.downloadFileName() or download_item.suggestedFileName()
+        self.path = os.path.join(download_item.downloadDirectory(), self.file_name)
+
+    def received(self): return self.download_item.receivedBytes()
+    def total(self): return self.download_item.totalBytes()
+    def error(self): return self.download_item.interruptReasonString()
+
+    def state(self):
+        state = self.STATES.get(self.download_item.state(), "Downloading")
+        return "Paused" if state == "Downloading" and self.download_item.isPaused() else state
+
+    # QWebEngineDownloadRequest.resume() only un-pauses; an interrupted request cannot be picked up again
+    def can_resume(self): return self.state() == "Paused"
+    def pause(self): self.download_item.pause()
+    def resume(self): self.download_item.resume()
+    def cancel(self): self.download_item.cancel()
+
+class EngineDownload:
+    def __init__(self, engine, job):
+        self.engine, self.job = engine, job
+        self.file_name, self.path = job.file_name, job.path
+
+    def received(self): return self.job.received()
+    def total(self): return self.job.total
+    def error(self): return self.job.error
+    def state(self): return self.job.state
+    def can_resume(self): return self.job.state in (DownloadJob.PAUSED, DownloadJob.FAILED)
+    def pause(self): self.engine.pause(self.job)
+    def resume(self): self.engine.resume(self.job)
+    def cancel(self): self.engine.cancel(self.job)
+
+class DownloadListModel(QAbstractListModel):
+    RecordRole = Qt.ItemDataRole.UserRole
+    ProgressRole = Qt.ItemDataRole.UserRole + 1
+    StatusRole = Qt.ItemDataRole.UserRole + 2
+    ACTIVE_STATES = ("Queued", "Downloading")
+    REFRESH_INTERVAL_MS = 100
+    SPEED_WINDOW_SECONDS = 5.0
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.records = []
+        self.rows = {}
+        self.status = {}
+        self.samples = {}
+        self.active = set()
+        self.timer = QTimer(self); self.timer.setInterval(self.REFRESH_INTERVAL_MS)
+        self.timer.timeout.connect(self.refresh_active)
+
+    def rowCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self.records)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        record = self.records[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole: return record.file_name
+        if role == self.RecordRole: return record
+        if role == self.StatusRole: return self.status.get(id(record), "")
+        if role == self.ProgressRole:
+            total = record.total()
+            return 100 if record.state() == "Completed" else int(record.received() * 100 / total) if total > 0 else 0
+        if role == Qt.ItemDataRole.ToolTipRole: return record.path
+        return None
+
+    def add(self, record):
+        self.beginInsertRows(QModelIndex(), len(self.records), len(self.records))
+        self.rows[id(record)] = len(self.records); self.records.append(record)
+        self.endInsertRows()
+        self.record_changed(record)
+
+    def record_changed(self, record):
+        key = id(record)
+        if key not in self.rows: return
+        if record.state() in self.ACTIVE_STATES:
+            self.active.add(key)
+            if not self.timer.isActive(): self.timer.start()
+        else:
+            self.active.discard(key); self.samples.pop(key, None)
+        self.status[key] = self.status_text(record)
+        index = self.index(self.rows[key]); self.dataChanged.emit(index, index)
+
+    def remove_finished(self):
+        keep = [record for record in self.records if id(record) in self.active or record.state() == "Paused"]
+        self.beginResetModel()
+        self.records = keep
+        self.rows = {id(record): row for row, record in enumerate(keep)}
+        self.status = {key: text for key, text in self.status.items() if key in self.rows}
+        self.endResetModel()
+
+    def speed(self, record):
+        samples = self.samples.setdefault(id(record), collections.deque())
+        now, received = time.monotonic(), record.received()
+        samples.append((now, received))
+        while len(samples) > 2 and now - samples[0][0] > self.SPEED_WINDOW_SECONDS: samples.popleft()
+        elapsed = now - samples[0][0]
+        return (received - samples[0][1]) / elapsed if elapsed > 0 else 0
+
+    def status_text(self, record, speed=None):
+        state, received, total = record.state(), record.received(), record.total()
+        if state == "Failed": return f"Failed: {record.error()}"
+        if state in ("Completed", "Cancelled"): return state
+        size = f"{format_bytes(received)} / {format_bytes(total)}" if total > 0 else format_bytes(received)
+        if state != "Downloading" or not speed: return f"{state} \u2014 {size}"
+        eta = f", {format_duration(max(0, total - received) / speed)} left" if total > 0 else ""
+        return f"{size} \u2014 {format_bytes(int(speed))}/s{eta}"
+
+    def refresh_active(self):
+        # Progress is sampled here at a fixed rate instead of on every receivedBytesChanged signal
+        if not self.active:
+            self.timer.stop(); return
+        changed = []
+        for key in list(self.active):
+            record = self.records[self.rows[key]]
+            if record.state() not in self.ACTIVE_STATES: self.active.discard(key); self.samples.pop(key, None)
+            self.status[key] = self.status_text(record, self.speed(record) if key in self.active else None)
+            changed.append(self.rows[key])
+        self.dataChanged.emit(self.index(min(changed)), self.index(max(changed)))
+
+class DownloadItemDelegate(QStyledItemDelegate):
+    ROW_HEIGHT = 58
+    MARGIN = 6
+
+    def sizeHint(self, option, index): return QSize(200, self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        style = option.widget.style() if option.widget else QApplication.style()
+        if option.state & QStyle.StateFlag.State_Selected: painter.fillRect(option.rect, option.palette.highlight())
+        rect = option.rect.adjusted(self.MARGIN, self.MARGIN // 2, -self.MARGIN, -self.MARGIN // 2)
+        line_height = option.fontMetrics.height()
+        name_rect = QRect(rect.left(), rect.top(), rect.width(), line_height)
+        bar_rect = QRect(rect.left(), name_rect.bottom() + 3, rect.width(), 12)
+        status_rect = QRect(rect.left(), bar_rect.bottom() + 3, rect.width(), line_height)
+        painter.drawText(name_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         option.fontMetrics.elidedText(index.data(), Qt.TextElideMode.ElideMiddle, name_rect.width()))
+        bar = QStyleOptionProgressBar()
+        bar.rect, bar.minimum, bar.maximum = bar_rect, 0, 100
+        bar.progress = index.data(DownloadListModel.ProgressRole)
+        bar.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Horizontal
+        style.drawControl(QStyle.ControlElement.CE_ProgressBar, bar, painter, option.widget)
+        painter.drawText(status_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, index.data(DownloadListModel.StatusRole))
+        painter.restore()
+
+class TokenBucket:
+    def __init__(self, rate=0):
+        self.rate = rate
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self.lock: self.rate, self.tokens, self.updated = rate, 0.0, time.monotonic()
+
+    def consume(self, amount):
+        # Tokens may go negative; the caller then sleeps off the debt, which keeps the average rate exact
+        with self.lock:
+            if not self.rate: return
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate) - amount
+            self.updated = now
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay: time.sleep(delay)
+
+class DownloadError(Exception):
+    pass
+
+class DownloadJob:
+    QUEUED, ACTIVE, PAUSED, COMPLETED, FAILED, CANCELLED = "Queued", "Downloading", "Paused", "Completed", "Failed", "Cancelled"
+
+    def __init__(self, url, path, headers=None, rate_limit=0, cookies=None):
+        self.url, self.path = url, path
+        self.headers = dict(headers or {})
+        self.cookies = cookies or {}
+        self.bucket = TokenBucket(rate_limit)
+        self.state = self.QUEUED
+        self.error = ""
+        self.total = -1
+        self.validator = None
+        self.supports_ranges = False
+        self.segments = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.cancelled = False
+        self.changed_on_server = False
+        self.last_saved = 0.0
+        self.save_lock = threading.Lock()
+
+    @property
+    def file_name(self): return os.path.basename(self.path)
+    @property
+    def part_path(self): return self.path + ".part"
+    @property
+    def state_path(self): return self.path + ".part.json"
+
+    def received(self):
+        with self.lock: return sum(done for start, end, done in self.segments)
+
+    def cookie_header(self, url):
+        import urllib.parse
+        parts = urllib.parse.urlsplit(url)
+        host, path, secure = (parts.hostname or "").lower(), parts.path or "/", parts.scheme == "https"
+        now, matched = time.time(), []
+        for suffix in DomainBlocklist.suffixes(host):
+            for name, value, domain, cookie_path, is_secure, host_only, expires in self.cookies.get(suffix, ()):
+                if (host_only and domain != host) or (is_secure and not secure) or (expires is not None and expires <= now): continue
+                if path != cookie_path and not path.startswith(cookie_path if cookie_path.endswith("/") else cookie_path + "/"): continue
+                matched.append((cookie_path, name, value))
+        # Cookies with longer paths go first, as browsers send them
+        matched.sort(key=lambda cookie: -len(cookie[0]))
+        return "; ".join(f"{name}={value}" for _, name, value in matched) or None
+
+    def save_state(self, force=False):
+        now = time.monotonic()
+        if not self.supports_ranges or (not force and now - self.last_saved < 1.0): return
+        # Segment threads skip the checkpoint while another one is writing it
+        if not self.save_lock.acquire(blocking=force): return
+        try:
+            self.last_saved = now
+            with self.lock: state = {"url": self.url, "total": self.total, "validator": self.validator, "segments": [list(s) for s in self.segments]}
+            with open(self.state_path + ".tmp", "w") as f: json.dump(state, f)
+            os.replace(self.state_path + ".tmp", self.state_path)
+        finally: self.save_lock.release()
+
+    def load_state(self):
+        try:
+            with open(self.state_path, "r") as f: state = json.load(f)
+        except (OSError, ValueError): return False
+        if state.get("url") != self.url or not os.path.exists(self.part_path): return False
+        self.total, self.validator, self.segments = state["total"], state["validator"], [list(s) for s in state["segments"]]
+        self.supports_ranges = True
+        return True
+
+class DownloadEngine(QObject):
+    job_added = Signal(object)
+    job_changed = Signal(object)
+    CHUNK_SIZE = 64 * 1024
+    MIN_SEGMENT_SIZE = 1024 * 1024
+    MAX_RETRIES = 5
+    TIMEOUT = 30
+
+    def __init__(self, max_active=3, segments_per_download=4, rate_limit=0, per_download_rate_limit=0):
+        super().__init__()
+        self.max_active = max_active
+        self.segments_per_download = segments_per_download
+        self.per_download_rate_limit = per_download_rate_limit
+        self.bucket = TokenBucket(rate_limit)
+        self.jobs = []
+        self.lock = threading.Lock()
+        self.opener = None
+
+    def set_max_active(self, count):
+        self.max_active = count; self.schedule()
+
+    def enqueue(self, url, path, headers=None, cookies=None):
+        job = DownloadJob(url, path, headers, self.per_download_rate_limit, cookies)
+        with self.lock: self.jobs.append(job)
+        self.job_added.emit(job)
+        self.schedule()
+        return job
+
+    def schedule(self):
+        with self.lock:
+            active = sum(job.state == DownloadJob.ACTIVE for job in self.jobs)
+            starting = [job for job in self.jobs if job.state == DownloadJob.QUEUED][:max(0, self.max_active - active)]
+            for job in starting: job.state = DownloadJob.ACTIVE; job.stop_event.clear()
+        for job in starting:
+            self.job_changed.emit(job)
+            threading.Thread(target=self.run, args=(job,), daemon=True).start()
+
+    def set_state(self, job, state, error=""):
+        job.state, job.error = state, error
+        self.job_changed.emit(job)
+
+    def pause(self, job):
+        if job.state == DownloadJob.QUEUED: self.set_state(job, DownloadJob.PAUSED)
+        elif job.state == DownloadJob.ACTIVE: job.stop_event.set()
+
+    def resume(self, job):
+        if job.state in (DownloadJob.PAUSED, DownloadJob.FAILED):
+            self.set_state(job, DownloadJob.QUEUED); self.schedule()
+
+    def cancel(self, job):
+        job.cancelled = True
+        if job.state == DownloadJob.ACTIVE: job.stop_event.set()
+        else: self.finish_cancel(job)
+
+    def pause_all(self):
+        for job in list(self.jobs): self.pause(job)
+
+    def finish_cancel(self, job):
+        for path in (job.part_path, job.state_path):
+            try: os.remove(path)
+            except OSError: pass
+        self.set_state(job, DownloadJob.CANCELLED)
+
+    def open(self, job, start=None, end=None):
+        import urllib.request  # Pulls in http.client/ssl/email, so it is only loaded once a download starts
+        if self.opener is None:
+            class CookieRedirectHandler(urllib.request.HTTPRedirectHandler):
+                # urllib copies request headers to the redirect target, so cookies are matched again for every hop
+                def redirect_request(self, request, fp, code, msg, headers, new_url):
+                    redirected = super().redirect_request(request, fp, code, msg, headers, new_url)
+                    if redirected is not None:
+                        redirected.remove_header("Cookie"); redirected.download_job = request.download_job
+                        if cookie := request.download_job.cookie_header(redirected.full_url): redirected.add_header("Cookie", cookie)
+                    return redirected
+            self.opener = urllib.request.build_opener(CookieRedirectHandler)
+        request = urllib.request.Request(job.url, headers=job.headers); request.download_job = job
+        if cookie := job.cookie_header(job.url): request.add_header("Cookie", cookie)
+        if start is not None:
+            request.add_header("Range", f"bytes={start}-{end}")
+            if job.validator: request.add_header("If-Range", job.validator)
+        return self.opener.open(request, timeout=self.TIMEOUT)
+
+    def probe(self, job):
+        with self.open(job, 0, 0) as response:
+            content_range = response.headers.get("Content-Range", "")
+            validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+            if response.status == 206 and "/" in content_range and not content_range.endswith("/*"):
+                return int(content_range.rsplit("/", 1)[1]), validator, True
+            return int(response.headers.get("Content-Length") or -1), validator, False
+
+    def plan_segments(self, total):
+        count = max(1, min(self.segments_per_download, total // self.MIN_SEGMENT_SIZE))
+        size = total // count
+        return [[i * size, (i + 1) * size - 1 if i < count - 1 else total - 1, 0] for i in range(count)]
+
+    def preallocate(self, path, size):
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            if size <= 0: return
+            if hasattr(os, "posix_fallocate"):
+                try: os.posix_fallocate(f.fileno(), 0, size); return
+                except OSError: pass
+            f.truncate(size)
+
+    def run(self, job):
+        import http.client  # Already loaded by urllib.request; its errors are not OSErrors
+        try:
+            os.makedirs(os.path.dirname(job.path) or ".", exist_ok=True)
+            if not job.load_state():
+                job.total, job.validator, job.supports_ranges = self.probe(job)
+                job.segments = self.plan_segments(job.total) if job.supports_ranges and job.total > 0 else [[0, job.total - 1, 0]]
+                self.preallocate(job.part_path, job.total if job.supports_ranges else 0)
+                job.save_state(force=True)
+            job.error, job.changed_on_server = "", False
+            threads = [threading.Thread(target=self.run_segment, args=(job, segment), daemon=True) for segment in job.segments if not self.segment_done(segment)]
+            for thread in threads: thread.start()
+            for thread in threads: thread.join()
+            if job.cancelled: self.finish_cancel(job)
+            elif job.changed_on_server:
+                # Progress is useless against a different file, so the next resume starts over
+                os.remove(job.state_path); self.set_state(job, DownloadJob.FAILED, job.error)
+            elif job.stop_event.is_set():
+                job.save_state(force=True); self.set_state(job, DownloadJob.FAILED if job.error else DownloadJob.PAUSED, job.error)
+            elif job.error or (job.total > 0 and job.received() < job.total):
+                # Without a known length a segment error is the only sign the file is incomplete, so it must not complete
+                job.save_state(force=True); self.set_state(job, DownloadJob.FAILED, job.error or "Connection closed early")
+            else:
+                os.replace(job.part_path, job.path)
+                try: os.remove(job.state_path)
+                except OSError: pass
+                self.set_state(job, DownloadJob.COMPLETED)
+        except (OSError, ValueError, DownloadError, http.client.HTTPException) as e:
+            self.set_state(job, DownloadJob.FAILED, str(e) or type(e).__name__)
+        finally: self.schedule()
+
+    @staticmethod
+    def segment_done(segment):
+        start, end, done = segment
+        return end >= 0 and start + done > end
+
+    def steal_segment(self, job):
+        # An idle connection takes over the upper half of the segment with the most bytes left
+        with job.lock:
+            remaining = lambda s: s[1] - (s[0] + s[2]) + 1
+            largest = max(job.segments, key=remaining, default=None)
+            if not largest or largest[1] < 0 or remaining(largest) < 2 * self.MIN_SEGMENT_SIZE: return None
+            middle = largest[0] + largest[2] + remaining(largest) // 2
+            segment = [middle, largest[1], 0]
+            largest[1] = middle - 1
+            job.segments.append(segment)
+            return segment
+
+    def run_segment(self, job, segment):
+        import http.client
+        while segment is not None:
+            retries = 0
+            while not self.segment_done(segment) and not job.stop_event.is_set():
+                try: self.fetch_segment(job, segment); retries = 0
+                except DownloadError as e:
+                    job.error, job.changed_on_server = str(e), True; job.stop_event.set(); return
+                except (OSError, http.client.HTTPException) as e:
+                    # IncompleteRead and friends are HTTPExceptions; left uncaught they would end the thread with the job still running
+                    retries += 1
+                    if retries > self.MAX_RETRIES:
+                        job.error = str(e) or type(e).__name__; job.stop_event.set(); return
+                    time.sleep(min(2 ** retries, 30)); continue
+                # Only a stream that ended normally may leave an empty body of unknown length open-ended
+                if segment[1] < 0: return
+            segment = self.steal_segment(job) if job.supports_ranges and not job.stop_event.is_set() else None
+
+    def fetch_segment(self, job, segment):
+        if not job.supports_ranges:
+            # A server without ranges always sends the body from its first byte, so a retry starts the file over
+            with job.lock: segment[2] = 0
+        start, end, done = segment
+        with self.open(job, start + done, end) if job.supports_ranges else self.open(job) as response:
+            if job.supports_ranges and response.status != 206: raise DownloadError("The file changed on the server, download it again")
+            with open(job.part_path, "r+b" if job.supports_ranges else "wb") as f:
+                f.seek(start + done)
+                while not job.stop_event.is_set():
+                    chunk = response.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        if segment[1] < 0: segment[1] = segment[0] + segment[2] - 1
+                        # http.client reports a body cut short by the server as a normal end of stream
+                        elif not self.segment_done(segment): raise ConnectionError("Connection closed early")
+                        return
+                    with job.lock:
+                        # The segment end can shrink while streaming when another connection steals its tail
+                        if segment[1] >= 0: chunk = chunk[:segment[1] - (segment[0] + segment[2]) + 1]
+                    if not chunk: return
+                    self.bucket.consume(len(chunk)); job.bucket.consume(len(chunk))
+                    f.write(chunk)
+                    with job.lock: segment[2] += len(chunk)
+                    job.save_state()
+
+class HistoryStore:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS urls (
+            id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, title TEXT NOT NULL DEFAULT '',
+            visit_count INTEGER NOT NULL DEFAULT 0, last_visit REAL NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS visits (id INTEGER PRIMARY KEY, url_id INTEGER NOT NULL REFERENCES urls(id), visited_at REAL NOT NULL);
+        CREATE INDEX IF NOT EXISTS visits_url_id ON visits(url_id);
+        CREATE INDEX IF NOT EXISTS urls_last_visit ON urls(last_visit);
+        CREATE VIRTUAL TABLE IF NOT EXISTS urls_fts USING fts5(title, url, content='urls', content_rowid='id', prefix='2 3');
+        CREATE TRIGGER IF NOT EXISTS urls_ai AFTER INSERT ON urls BEGIN
+            INSERT INTO urls_fts(rowid, title, url) VALUES (new.id, new.title, new.url);
+        END;
+        CREATE TRIGGER IF NOT EXISTS urls_ad AFTER DELETE ON urls BEGIN
+            INSERT INTO urls_fts(urls_fts, rowid, title, url) VALUES ('delete', old.id, old.title, old.url);
+        END;
+        CREATE TRIGGER IF NOT EXISTS urls_au AFTER UPDATE OF title, url ON urls BEGIN
+            INSERT INTO urls_fts(urls_fts, rowid, title, url) VALUES ('delete', old.id, old.title, old.url);
+            INSERT INTO urls_fts(rowid, title, url) VALUES (new.id, new.title, new.url);
+        END;
+    """
+    RECORDED_SCHEMES = ("http://", "https://", "file://")
+    FLUSH_DELAY_MS = 2000
+    BATCH_SIZE = 200
+    CANDIDATE_FACTOR = 10
+
+    def __init__(self, db_path, executor):
+        self.db_path = db_path
+        self.executor = executor
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.flush_scheduled = False
+        self.local = threading.local()
+        self.writer = None
+
+    def connect(self):
+        connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL"); connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def reader(self):
+        if not hasattr(self.local, "connection"):
+            with self.write_lock: self.ensure_writer()
+            self.local.connection = self.connect()
+        return self.local.connection
+
+    def ensure_writer(self):
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self.writer = self.connect()
+            self.writer.executescript(self.SCHEMA)
+        return self.writer
+
+    def record_visit(self, url, title=""):
+        if url.startswith(self.RECORDED_SCHEMES): self.queue(("visit", url, title, time.time()))
+
+    def update_title(self, url, title):
+        if title and url.startswith(self.RECORDED_SCHEMES): self.queue(("title", url, title, None))
+
+    def queue(self, entry):
+        with self.pending_lock:
+            self.pending.append(entry)
+            batch_full = len(self.pending) >= self.BATCH_SIZE
+            if self.flush_scheduled and not batch_full: return
+            self.flush_scheduled = True
+        if batch_full: self.executor.submit(self.flush)
+        else: QTimer.singleShot(self.FLUSH_DELAY_MS, lambda: self.executor.submit(self.flush))
+
+    def flush(self):
+        with self.pending_lock:
+            entries, self.pending, self.flush_scheduled = self.pending, [], False
+        if not entries: return
+        with self.write_lock:
+            connection = self.ensure_writer()
+            with connection:
+                for kind, url, title, visited_at in entries:
+                    if kind == "visit":
+                        connection.execute(
+                            "INSERT INTO urls(url, title, visit_count, last_visit) VALUES (?, ?, 1, ?) "
+                            "ON CONFLICT(url) DO UPDATE SET visit_count = visit_count + 1, last_visit = excluded.last_visit",
+                            (url, title, visited_at))
+                        connection.execute("INSERT INTO visits(url_id, visited_at) SELECT id, ? FROM urls WHERE url = ?", (visited_at, url))
+                    else:
+                        connection.execute("UPDATE urls SET title = ? WHERE url = ? AND title != ?", (title, url, title))
+
+    @staticmethod
+    def fts_query(text):
+        tokens = re.findall(r"\w+", text.lower())
+        return " ".join('"' + token + '"*' for token in tokens)
+
+    def search(self, text, limit=50):
+        columns = "urls.url, urls.title, urls.visit_count, urls.last_visit"
+        if not (query := self.fts_query(text)):
+            return self.reader().execute(f"SELECT {columns} FROM urls ORDER BY last_visit DESC LIMIT ?", (limit,)).fetchall()
+        # Ranking every match is linear in the match count, so only the newest candidates are ranked
+        return self.reader().execute(
+            f"SELECT {columns} FROM (SELECT rowid FROM urls_fts WHERE urls_fts MATCH ? ORDER BY rowid DESC LIMIT ?) AS matches "
+            f"JOIN urls ON urls.id = matches.rowid ORDER BY urls.visit_count DESC, urls.last_visit DESC LIMIT ?",
+            (query, limit * self.CANDIDATE_FACTOR, limit)).fetchall()
+
+    def clear(self):
+        with self.pending_lock: self.pending = []
+        with self.write_lock:
+            connection = self.ensure_writer()
+            with connection:
+                connection.execute("DELETE FROM visits"); connection.execute("DELETE FROM urls")
+                connection.execute("INSERT INTO urls_fts(urls_fts) VALUES ('rebuild')")
+
+    def close(self):
+        self.flush()
+        with self.write_lock:
+            if self.writer is not None: self.writer.close(); self.writer = None
+
+class BookmarkStore(QObject):
+    bookmark_added = Signal(str, str, str)
+    bookmark_removed = Signal(str, str)
+    bookmarks_reset = Signal()
+    COMPACT_MIN_RECORDS = 1000
+
+    def __init__(self, log_path, executor):
+        super().__init__()
+        self.log_path = log_path
+        self.executor = executor
+        self.bookmarks = {}
+        self.folder_index = {}
+        self.log_records = 0
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+
+    def __len__(self): return len(self.bookmarks)
+    def __contains__(self, url): return url in self.bookmarks
+
+    def get(self, url): return self.bookmarks.get(url)
+    def folders(self): return sorted(folder for folder in self.folder_index if folder)
+    def in_folder(self, folder="", start=0, stop=None): return list(itertools.islice(self.folder_index.get(folder, {}).items(), start, stop))
+    def folder_size(self, folder=""): return len(self.folder_index.get(folder, ()))
+    def export(self): return [[url, title, folder] for url, (title, folder) in self.bookmarks.items()]
+
+    def _add(self, url, title, folder):
+        self.bookmarks[url] = (title, folder)
+        self.folder_index.setdefault(folder, {})[url] = title
+
+    def _remove(self, url):
+        title, folder = self.bookmarks.pop(url)
+        entries = self.folder_index[folder]; del entries[url]
+        if not entries and folder: del self.folder_index[folder]
+        return folder
+
+    def load(self):
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try: record = json.loads(line)
+                    except ValueError: continue
+                    self.log_records += 1
+                    if record.get("op") == "add": self._add(record["url"], record.get("title", ""), record.get("folder", ""))
+                    elif record.get("op") == "remove" and record.get("url") in self.bookmarks: self._remove(record["url"])
+        except FileNotFoundError: pass
+        self.bookmarks_reset.emit()
+
+    def add(self, url, title, folder=""):
+        if url in self.bookmarks: return False
+        self._add(url, title, folder)
+        self.append([{"op": "add", "url": url, "title": title, "folder": folder}])
+        self.bookmark_added.emit(url, title, folder)
+        return True
+
+    def add_many(self, entries):
+        records = []
+        for url, title, *rest in entries:
+            folder = rest[0] if rest else ""
+            if url in self.bookmarks: continue
+            self._add(url, title, folder)
+            records.append({"op": "add", "url": url, "title": title, "folder": folder})
+        if records:
+            self.append(records)
+            self.bookmarks_reset.emit()
+        return len(records)
+
+    def remove(self, url):
+        if url not in self.bookmarks: return False
+        folder = self._remove(url)
+        self.append([{"op": "remove", "url": url}])
+        self.bookmark_removed.emit(url, folder)
+        return True
+
+    def append(self, records):
+        self.log_records += len(records)
+        lines = "".join(json.dumps(record) + "\n" for record in records)
+        with self.pending_lock: self.pending.append(("append", lines))
+        if self.log_records > max(self.COMPACT_MIN_RECORDS, 2 * len(self.bookmarks)):
+            # The snapshot is taken here on the GUI thread so the writer never reads the live dicts
+            self.log_records = len(self.bookmarks)
+            lines = "".join(json.dumps({"op": "add", "url": url, "title": title, "folder": folder}) + "\n" for url, title, folder in self.export())
+            with self.pending_lock: self.pending.append(("compact", lines))
+        self.executor.submit(self.flush)
+
+    def flush(self):
+        with self.write_lock:
+            with self.pending_lock: operations, self.pending = self.pending, []
+            for kind, lines in operations:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                if kind == "append":
+                    with open(self.log_path, "a", encoding="utf-8") as f: f.write(lines)
+                else:
+                    with open(self.log_path + ".tmp", "w", encoding="utf-8") as f: f.write(lines)
+                    os.replace(self.log_path + ".tmp", self.log_path)
+
+class Suggestion:
+    __slots__ = ("url", "title", "visit_count", "last_visit", "bookmarked", "terms", "haystack", "stripped_url", "score")
+
+    def __init__(self, url, title=""):
+        self.url, self.title = url, title
+        self.visit_count, self.last_visit, self.bookmarked = 0, 0.0, False
+        self.terms = set()
+        self.haystack = ""
+        self.stripped_url = SuggestionIndex.strip_url(url)
+        self.score = 0
+
+class SuggestionIndex:
+    MAX_CANDIDATES = 2000
+    # Firefox-style recency buckets: (maximum age in days, weight)
+    RECENCY_WEIGHTS = ((4, 100), (14, 70), (31, 50), (90, 30))
+    BOOKMARK_BONUS = 150
+
+    def __init__(self):
+        self.entries = {}
+        self.terms = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def strip_url(url):
+        url = url.lower().split("://", 1)[-1]
+        return url[4:] if url.startswith("www.") else url
+
+    @classmethod
+    def terms_for(cls, url, title):
+        stripped = cls.strip_url(url)
+        return {stripped} | set(re.findall(r"\w+", stripped)) | set(re.findall(r"\w+", title.lower()))
+
+    def _apply(self, url, title, visits, last_visit, bookmarked):
+        entry = self.entries.get(url) or self.entries.setdefault(url, Suggestion(url))
+        if title: entry.title = title
+        entry.visit_count += visits
+        if last_visit: entry.last_visit = max(entry.last_visit, last_visit)
+        if bookmarked is not None: entry.bookmarked = bookmarked
+        if not entry.visit_count and not entry.bookmarked:
+            del self.entries[url]; return None
+        # Frecency is cached per entry; recency buckets are days wide so it only needs refreshing on updates
+        entry.score = self.frecency(entry, time.time())
+        return entry
+
+    def update(self, url, title="", visits=0, last_visit=None, bookmarked=None):
+        with self.lock:
+            old_terms = self.entries[url].terms if url in self.entries else set()
+            entry = self._apply(url, title, visits, last_visit, bookmarked)
+            new_terms = self.terms_for(url, entry.title) if entry else set()
+            for term in old_terms - new_terms:
+                i = bisect.bisect_left(self.terms, (term, url))
+                if i < len(self.terms) and self.terms[i] == (term, url): del self.terms[i]
+            for term in new_terms - old_terms: bisect.insort(self.terms, (term, url))
+            if entry: entry.terms, entry.haystack = new_terms, " " + " ".join(new_terms)
+
+    def clear(self):
+        with self.lock: self.entries, self.terms = {}, []
+
+    def load(self, rows):
+        with self.lock:
+            for url, title, visits, last_visit, bookmarked in rows:
+                if entry := self._apply(url, title, visits, last_visit, bookmarked):
+                    entry.terms = self.terms_for(url, entry.title); entry.haystack = " " + " ".join(entry.terms)
+            self.terms = sorted((term, url) for url, entry in self.entries.items() for term in entry.terms)
+
+    def frecency(self, entry, now):
+        age_days = (now - entry.last_visit) / 86400
+        weight = next((w for days, w in self.RECENCY_WEIGHTS if age_days < days), 10)
+        return entry.visit_count * weight + (self.BOOKMARK_BONUS if entry.bookmarked else 0)
+
+    def prefix_range(self, token):
+        return bisect.bisect_left(self.terms, (token,)), bisect.bisect_left(self.terms, (token + "\uffff",))
+
+    def query(self, text, limit=8, open_tabs=()):
+        # Tokens get the same scheme and "www." stripping as the indexed terms, so pasted or typed URLs still match
+        tokens = [token for token in map(self.strip_url, text.split()) if token]
+        if not tokens: return []
+        stripped_text = self.strip_url(text.strip())
+        results = [("tab", url, title, tab) for url, title, tab in open_tabs
+                   if all(token in f"{url} {title}".lower() for token in tokens)][:3]
+        with self.lock:
+            (lo, hi), anchor = min(((self.prefix_range(token), token) for token in tokens), key=lambda r: r[0][1] - r[0][0])
+            other_tokens = [" " + token for token in tokens if token != anchor]
+            terms, entries = self.terms, self.entries
+            scored = []
+            for url in {terms[i][1] for i in range(lo, min(hi, lo + self.MAX_CANDIDATES))}:
+                entry = entries[url]
+                if other_tokens and not all(token in entry.haystack for token in other_tokens): continue
+                # Typing the start of a known URL is a much stronger signal than a word match
+                score = entry.score * 2 + 1 if entry.stripped_url.startswith(stripped_text) else entry.score
+                scored.append((score, url, entry.title, "bookmark" if entry.bookmarked else "history"))
+        open_urls = {url for _, url, _, _ in results}
+        for score, url, title, kind in heapq.nlargest(limit, scored):
+            if url not in open_urls and len(results) < limit: results.append((kind, url, title, None))
+        return results
+
+class Omnibox(QObject):
+    suggestions_ready = Signal(int, list)
+    url_selected = Signal(str)
+    tab_selected = Signal(object)
+    predicted = Signal(str)
+    DEBOUNCE_MS = 40
+    MAX_SUGGESTIONS = 8
+    MIN_PREDICTION_CHARS = 3
+    TAB_ROLE = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, line_edit, index, executor, open_tabs):
+        super().__init__(line_edit)
+        self.line_edit, self.index, self.executor, self.open_tabs = line_edit, index, executor, open_tabs
+        self.generation = 0
+        self.future = None
+        self.model = QStandardItemModel(self)
+        self.completer = QCompleter(self.model, line_edit)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.setWidget(line_edit)
+        self.timer = QTimer(self); self.timer.setSingleShot(True); self.timer.setInterval(self.DEBOUNCE_MS)
+        line_edit.textEdited.connect(self.timer.start)
+        self.timer.timeout.connect(self.request_suggestions)
+        self.suggestions_ready.connect(self.show_suggestions)
+        self.completer.activated[QModelIndex].connect(self.on_activated)
+
+    def is_selecting(self):
+        popup = self.completer.popup()
+        return popup.isVisible() and popup.currentIndex().isValid()
+
+    def request_suggestions(self):
+        self.generation += 1
+        if self.future: self.future.cancel()
+        text = self.line_edit.text().strip()
+        if not text:
+            self.completer.popup().hide(); return
+        self.future = self.executor.submit(self._query, self.generation, text, self.open_tabs())
+
+    def _query(self, generation, text, open_tabs):
+        if generation != self.generation: return
+        self.suggestions_ready.emit(generation, self.index.query(text, self.MAX_SUGGESTIONS, open_tabs))
+
+    def show_suggestions(self, generation, suggestions):
+        if generation != self.generation or not self.line_edit.hasFocus(): return
+        self.model.clear()
+        for kind, url, title, tab in suggestions:
+            label = f"Switch to tab: {title or url}" if kind == "tab" else f"{title} \u2014 {url}" if title else url
+            item = QStandardItem(label); item.setData(url, Qt.ItemDataRole.UserRole); item.setData(tab, self.TAB_ROLE)
+            self.model.appendRow(item)
+        # Only the best known URL that starts with what was typed is a strong enough signal to preload
+        stripped = SuggestionIndex.strip_url(self.line_edit.text().strip())
+        if url := next((url for kind, url, _, _ in suggestions if kind != "tab"), None):
+            if len(stripped) >= self.MIN_PREDICTION_CHARS and SuggestionIndex.strip_url(url).startswith(stripped): self.predicted.emit(url)
+        if not suggestions:
+            self.completer.popup().hide(); return
+        self.completer.complete()
+        self.completer.popup().setCurrentIndex(QModelIndex())
+
+    def on_activated(self, index):
+        self.generation += 1
+        if (tab := index.data(self.TAB_ROLE)) is not None: self.tab_selected.emit(tab)
+        else: self.url_selected.emit(index.data(Qt.ItemDataRole.UserRole))
+
+def process_rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f: return int(f.read().split()[1]) * mmap.PAGESIZE
+    except (OSError, ValueError, IndexError): return 0
+
+class SessionStore:
+    MAGIC = 0x44424253
+    VERSION = 2
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.write_lock = threading.Lock()
+        self.sequence = 0
+        self.written_sequence = 0
+
+    @classmethod
+    def serialize(cls, tabs, current_index):
+        data = QByteArray(); stream = QDataStream(data, QIODevice.OpenModeFlag.WriteOnly)
+        stream.writeUInt32(cls.MAGIC); stream.writeUInt32(cls.VERSION)
+        stream.writeInt32(current_index); stream.writeInt32(len(tabs))
+        for url, title, history_state, container in tabs:
+            stream.writeQString(url); stream.writeQString(title); stream << (history_state or QByteArray())
+            stream.writeQString(container)
+        return bytes(data)
+
+    @classmethod
+    def parse(cls, data):
+        stream = QDataStream(QByteArray(data))
+        if stream.readUInt32() != cls.MAGIC: raise ValueError("not a session file")
+        version = stream.readUInt32()
+        if version not in (1, cls.VERSION): raise ValueError(f"unsupported session version {version}")
+        current_index, count = stream.readInt32(), stream.readInt32()
+        tabs = []
+        for _ in range(count):
+            url, title = stream.readQString(), stream.readQString()
+            history_state = QByteArray(); stream >> history_state
+            container = stream.readQString() if version >= 2 else ProfileManager.DEFAULT
+            tabs.append((url, title, history_state if not history_state.isEmpty() else None, container))
+        if stream.status() != QDataStream.Status.Ok: raise ValueError("truncated session file")
+        return tabs, current_index
+
+    def next_sequence(self):
+        self.sequence += 1
+        return self.sequence
+
+    def write(self, data, sequence):
+        with self.write_lock:
+            # Checkpoints are written from the executor, so an older one can arrive after the final save on close
+            if sequence < self.written_sequence: return
+            self.written_sequence = sequence
+            os.makedirs(os.path.dirname(self.file_name) or ".", exist_ok=True)
+            with open(self.file_name + ".tmp", "wb") as f:
+                f.write(data); f.flush(); os.fsync(f.fileno())
+            # The previous checkpoint is kept as a fallback in case this one is ever found damaged
+            if os.path.exists(self.file_name): os.replace(self.file_name, self.file_name + ".bak")
+            os.replace(self.file_name + ".tmp", self.file_name)
+
+    def read(self):
+        for file_name in (self.file_name, self.file_name + ".bak"):
+            try:
+                with open(file_name, "rb") as f: return self.parse(f.read())
+            except (OSError, ValueError): continue
+        return [], -1
+
+class ContainerProfile:
+    CACHE_TYPES = {
+        "memory": QWebEngineProfile.HttpCacheType.MemoryHttpCache,
+        "disk": QWebEngineProfile.HttpCacheType.DiskHttpCache,
+        "off": QWebEngineProfile.HttpCacheType.NoCache,
+    }
+    COLORS = ("#1f77b4", "#2ca02c", "#d62728", "#9467bd", "#ff7f0e", "#17becf", "#8c564b", "#e377c2")
+
+    def __init__(self, name, profile, off_the_record=False, cache_mode="disk", cache_size_mb=256):
+        self.name, self.profile, self.off_the_record = name, profile, off_the_record
+        self.cache_mode, self.cache_size_mb = cache_mode, cache_size_mb
+        self.cookies_by_host = {}
+        self.cache_hits, self.cache_lookups = 0, 0
+        profile.cookieStore().cookieAdded.connect(self.on_cookie_added)
+        profile.cookieStore().cookieRemoved.connect(self.on_cookie_removed)
+        # Persisted cookies are only reported once loaded; downloads need them from the start, not after Site Data is opened
+        if not off_the_record: profile.cookieStore().loadAllCookies()
+        self.apply_cache_settings()
+
+    def color(self):
+        return self.COLORS[hashlib.blake2b(self.name.encode(), digest_size=1).digest()[0] % len(self.COLORS)]
+
+    def apply_cache_settings(self):
+        # Off-the-record profiles can only keep their cache in memory
+        mode = "memory" if self.off_the_record and self.cache_mode == "disk" else self.cache_mode
+        self.profile.setHttpCacheType(self.CACHE_TYPES[mode])
+        self.profile.setHttpCacheMaximumSize(self.cache_size_mb * 1024 * 1024)
+
+    @staticmethod
+    def cookie_host(cookie):
+        return cookie.domain().lstrip(".") or "(unknown)"
+
+    def on_cookie_added(self, cookie):
+        key = (bytes(cookie.name()), cookie.domain(), cookie.path())
+        self.cookies_by_host.setdefault(self.cookie_host(cookie), {})[key] = cookie
+
+    def on_cookie_removed(self, cookie):
+        host = self.cookie_host(cookie)
+        cookies = self.cookies_by_host.get(host, {})
+        cookies.pop((bytes(cookie.name()), cookie.domain(), cookie.path()), None)
+        if not cookies: self.cookies_by_host.pop(host, None)
+
+    def cookie_snapshot(self):
+        # Plain tuples for the download threads, which match them again for every URL of a redirect chain
+        return {host.lower(): [(bytes(c.name()).decode("latin-1"), bytes(c.value()).decode("latin-1"), c.domain().lstrip(".").lower(), c.path() or "/",
+                                c.isSecure(), not c.domain().startswith("."), None if c.isSessionCookie() else c.expirationDate().toSecsSinceEpoch())
+                               for c in cookies.values()]
+                for host, cookies in self.cookies_by_host.items()}
+
+class ProfileManager(QObject):
+    profile_created = Signal(object)
+    DEFAULT = "default"
+    PRIVATE = "Private"
+    SETTINGS_NAME = "containers.json"
+
+    def __init__(self, data_dir, interceptor, parent=None):
+        super().__init__(parent)
+        self.data_dir, self.interceptor = data_dir, interceptor
+        self.profiles = {}
+        self.settings = {self.DEFAULT: {"cache_mode": "disk", "cache_size_mb": 256}}
+        try:
+            with open(os.path.join(data_dir, self.SETTINGS_NAME), "r") as f: self.settings.update(json.load(f))
+        except (OSError, ValueError): pass
+
+    def names(self):
+        return [self.DEFAULT] + sorted(name for name in self.settings if name != self.DEFAULT)
+
+    @classmethod
+    def storage_name(cls, name):
+        return name if name == cls.DEFAULT else "container-" + hashlib.blake2b(name.encode(), digest_size=6).hexdigest()
+
+    def storage_paths(self, name):
+        storage_name = self.storage_name(name)
+        return os.path.join(self.data_dir, "profiles", storage_name), os.path.join(self.data_dir, "cache", storage_name)
+
+    def get(self, name):
+        if name in self.profiles: return self.profiles[name]
+        if name == self.PRIVATE:
+            container = ContainerProfile(name, QWebEngineProfile(self), off_the_record=True, cache_mode="memory", cache_size_mb=0)
+        else:
+            settings = self.settings.get(name) or self.settings[self.DEFAULT]
+            profile = QWebEngineProfile(self.storage_name(name), self)
+            storage_path, cache_path = self.storage_paths(name)
+            profile.setPersistentStoragePath(storage_path); profile.setCachePath(cache_path)
+            container = ContainerProfile(name, profile, cache_mode=settings["cache_mode"], cache_size_mb=settings["cache_size_mb"])
+        # Every profile shares the one interceptor, so the compiled blocklist and filter index are only mapped once
+        container.profile.setUrlRequestInterceptor(self.interceptor)
+        self.profiles[name] = container
+        self.profile_created.emit(container)
+        return container
+
+    def add(self, name):
+        if not name or name in self.settings or name == self.PRIVATE: return False
+        self.settings[name] = dict(self.settings[self.DEFAULT]); self.save()
+        return True
+
+    def remove(self, name):
+        if name in (self.DEFAULT, self.PRIVATE) or name not in self.settings: return None
+        del self.settings[name]; self.save()
+        self.release(name)
+        return self.storage_paths(name)
+
+    def release(self, name):
+        if container := self.profiles.pop(name, None): container.profile.deleteLater()
+
+    def set_cache(self, name, mode=None, size_mb=None):
+        if name not in self.settings: return
+        settings = self.settings[name]
+        if mode is not None: settings["cache_mode"] = mode
+        if size_mb is not None: settings["cache_size_mb"] = size_mb
+        self.save()
+        if container := self.profiles.get(name):
+            container.cache_mode, container.cache_size_mb = settings["cache_mode"], settings["cache_size_mb"]
+            container.apply_cache_settings()
+
+    def save(self):
+        file_name = os.path.join(self.data_dir, self.SETTINGS_NAME)
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(file_name + ".tmp", "w") as f: json.dump(self.settings, f, indent=4)
+        os.replace(file_name + ".tmp", file_name)
+
+class PageLoad:
+    __slots__ = ("url", "title", "started_at", "started", "finished", "ok", "blocking", "speculative", "baseline", "allowed", "blocked", "timing")
+    EXPORT_FIELDS = (
+        "started_at", "url", "title", "ok", "blocking", "speculative", "duration_ms", "ttfb_ms", "dom_content_loaded_ms", "load_event_ms",
+        "first_paint_ms", "first_contentful_paint_ms", "transfer_bytes", "resources", "allowed_requests", "blocked_requests",
+    )
+    TIMING_FIELDS = ("ttfb_ms", "dom_content_loaded_ms", "load_event_ms", "first_paint_ms", "first_contentful_paint_ms", "transfer_bytes", "resources")
+
+    def __init__(self, url, blocking, baseline):
+        self.url, self.title = url, ""
+        self.started_at, self.started, self.finished = time.time(), time.monotonic(), None
+        self.ok, self.blocking, self.speculative = False, blocking, False
+        self.baseline = baseline
+        self.allowed, self.blocked = 0, 0
+        self.timing = {}
+
+    def finish(self, url, title, ok, totals):
+        self.finished = time.monotonic()
+        self.url, self.title, self.ok = url or self.url, title, ok
+        # Requests are counted per first-party origin, so concurrent loads of the same origin share these counts
+        origin = RequestCounter.origin(QUrl(self.url))
+        allowed, blocked = totals.get(origin, (0, 0)); base_allowed, base_blocked = self.baseline.get(origin, (0, 0))
+        self.allowed, self.blocked, self.baseline = allowed - base_allowed, blocked - base_blocked, None
+
+    def set_timing(self, result):
+        if isinstance(result, dict):
+            self.timing = {key: round(result[key], 1) if isinstance(result[key], float) else result[key] for key in self.TIMING_FIELDS if result.get(key) is not None}
+
+    def as_dict(self):
+        row = dict.fromkeys(self.EXPORT_FIELDS)
+        row.update(self.timing)
+        row.update(started_at=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)), url=self.url, title=self.title, ok=self.ok, blocking=self.blocking, speculative=self.speculative,
+                   duration_ms=round((self.finished - self.started) * 1000, 1) if self.finished else None,
+                   allowed_requests=self.allowed, blocked_requests=self.blocked)
+        return row
+
+def write_metrics(file_name, table, loads, origins, load_fields=PageLoad.EXPORT_FIELDS, summary=None):
+    with open(file_name, "w", newline="") as f:
+        if file_name.lower().endswith(".json"):
+            json.dump({"loads": loads, "origins": origins, **({"summary": summary} if summary else {})}, f, indent=4); return
+        rows, fields = (origins, ("origin", "allowed_requests", "blocked_requests", "top_blocked_hosts")) if table == "origins" else (loads, load_fields)
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore"); writer.writeheader()
+        for row in rows:
+            if table == "origins": row = dict(row, top_blocked_hosts=" ".join(f"{host}:{count}" for host, count in row["top_blocked_hosts"].items()))
+            writer.writerow(row)
+
+class Speculation:
+    __slots__ = ("url", "profile", "page", "load", "progress", "last_hint")
+
+    def __init__(self, url, profile, page, load):
+        self.url, self.profile, self.page, self.load = url, profile, page, load
+        self.progress = 0
+        self.last_hint = time.monotonic()
+
+    def saved_ms(self, now):
+        # Everything the hidden page already did before the user committed is time they no longer wait
+        return round(((self.load.finished or now) - self.load.started) * 1000, 1)
+
+class Speculator(QObject):
+    stats_changed = Signal(dict)
+    HAS_LIFECYCLE = hasattr(QWebEnginePage, "LifecycleState")
+    HINT_DELAY_MS = 150
+    MAX_AGE_SECONDS = 60
+    CHECK_INTERVAL_MS = 2000
+
+    def __init__(self, interceptor, parent=None):
+        super().__init__(parent)
+        self.interceptor = interceptor
+        self.enabled, self.max_pages, self.memory_cap_mb = True, 2, 256
+        self.javascript_enabled = True
+        self.speculations = collections.OrderedDict()
+        self.pending = None
+        self.counts = dict.fromkeys(("started", "hits", "warm", "wasted"), 0)
+        self.total_saved_ms = 0.0
+        # Hovering across a menu or typing through a word should only preload where the user comes to rest
+        self.hint_timer = QTimer(self); self.hint_timer.setSingleShot(True); self.hint_timer.setInterval(self.HINT_DELAY_MS)
+        self.hint_timer.timeout.connect(self.start_pending)
+        self.check_timer = QTimer(self); self.check_timer.setInterval(self.CHECK_INTERVAL_MS)
+        self.check_timer.timeout.connect(self.enforce_budget)
+
+    @staticmethod
+    def key(url, profile):
+        return QUrl(url).toString(), profile
+
+    def hint(self, url, profile):
+        if not self.enabled or not self.max_pages or not url.startswith(("http://", "https://")): return
+        if speculation := self.speculations.get(self.key(url, profile)):
+            speculation.last_hint = time.monotonic(); self.speculations.move_to_end(self.key(url, profile)); return
+        self.pending = (url, profile); self.hint_timer.start()
+
+    def cancel_hint(self):
+        self.pending = None; self.hint_timer.stop()
+
+    def start_pending(self):
+        if not self.pending: return
+        (url, profile), self.pending = self.pending, None
+        key = self.key(url, profile)
+        if key in self.speculations: return
+        while len(self.speculations) >= self.max_pages: self.evict(next(iter(self.speculations.values())))
+        # The page lives on the tab's own profile, so its requests pass the shared interceptor and fill the same cache
+        page = QWebEnginePage(profile, self)
+        page.settings().setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, self.javascript_enabled)
+        load = PageLoad(key[0], self.interceptor.blocking, self.interceptor.request_counter.totals()); load.speculative = True
+        speculation = self.speculations[key] = Speculation(key[0], profile, page, load)
+        page.loadProgress.connect(lambda progress, speculation=speculation: setattr(speculation, "progress", progress))
+        page.loadFinished.connect(lambda ok, speculation=speculation: self.on_load_finished(speculation, ok))
+        page.setUrl(QUrl(url))
+        self.counts["started"] += 1
+        if not self.check_timer.isActive(): self.check_timer.start()
+        self.emit_stats()
+
+    def on_load_finished(self, speculation, ok):
+        if self.speculations.get(self.key(speculation.url, speculation.profile)) is not speculation or speculation.load.finished: return
+        if not ok: self.evict(speculation); return
+        page = speculation.page
+        speculation.load.finish(page.url().toString(), page.title(), ok, self.interceptor.request_counter.totals())
+        # A loaded page waiting to be used has no reason to keep running timers and animations
+        if self.HAS_LIFECYCLE: page.setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+        self.enforce_budget()
+
+    def claim(self, url, profile, adopt):
+        speculation = self.speculations.pop(self.key(url, profile), None)
+        if speculation is None: return None
+        if not adopt:
+            # The page cannot replace one with history worth keeping, but the navigation still finds warm connections and cache
+            self.counts["warm"] += 1; speculation.page.deleteLater(); self.emit_stats(); return None
+        self.counts["hits"] += 1; self.total_saved_ms += speculation.saved_ms(time.monotonic())
+        speculation.page.loadProgress.disconnect(); speculation.page.loadFinished.disconnect()
+        if self.HAS_LIFECYCLE: speculation.page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        self.emit_stats()
+        return speculation
+
+    def evict(self, speculation):
+        self.speculations.pop(self.key(speculation.url, speculation.profile), None)
+        self.counts["wasted"] += 1; speculation.page.deleteLater()
+        self.emit_stats()
+
+    def enforce_budget(self):
+        now = time.monotonic()
+        for speculation in [s for s in self.speculations.values() if now - s.last_hint > self.MAX_AGE_SECONDS]: self.evict(speculation)
+        # Oldest first until the renderers of the hidden pages fit the cap; a renderer shared with an open tab counts in full
+        while self.speculations:
+            pids = {speculation.page.renderProcessPid() for speculation in self.speculations.values()}
+            if sum(map(process_rss, pids)) <= self.memory_cap_mb * 1024 * 1024: break
+            self.evict(next(iter(self.speculations.values())))
+        if not self.speculations: self.check_timer.stop()
+
+    def discard_profile(self, profile):
+        # A hint still waiting on its timer would otherwise create a page on the profile after it has been released
+        if self.pending and self.pending[1] is profile: self.cancel_hint()
+        for speculation in [s for s in self.speculations.values() if s.profile is profile]: self.evict(speculation)
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if not enabled:
+            self.cancel_hint()
+            for speculation in list(self.speculations.values()): self.evict(speculation)
+
+    def set_budget(self, max_pages=None, memory_cap_mb=None):
+        if max_pages is not None: self.max_pages = max_pages
+        if memory_cap_mb is not None: self.memory_cap_mb = memory_cap_mb
+        while len(self.speculations) > self.max_pages: self.evict(next(iter(self.speculations.values())))
+        self.enforce_budget()
+
+    def stats(self):
+        started = self.counts["started"]
+        return {**self.counts, "active": len(self.speculations), "hit_rate": (self.counts["hits"] + self.counts["warm"]) / started if started else 0.0,
+                "saved_ms": round(self.total_saved_ms, 1)}
+
+    def emit_stats(self):
+        self.stats_changed.emit(self.stats())
+
+class BrowserTab(QWidget):
+    HAS_LIFECYCLE = hasattr(QWebEnginePage, "LifecycleState")
+
+    def __init__(self, url, title, view_factory, container=ProfileManager.DEFAULT):
+        super().__init__()
+        self.url, self.title = url, title
+        self.container = container
+        self.view_factory = view_factory
+        self.view = None
+        self.scroll_position = None
+        self.history_state = None
+        self.load_progress = -1
+        self.page_load = None
+        self.speculation = None
+        self.last_active = time.monotonic()
+        self.layout = QVBoxLayout(self); self.layout.setContentsMargins(0, 0, 0, 0)
+
+    def is_loaded(self): return self.view is not None
+
+    def lifecycle_state(self):
+        if not self.view or not self.HAS_LIFECYCLE: return None
+        return self.view.page().lifecycleState()
+
+    def activate(self):
+        self.last_active = time.monotonic()
+        if not self.view:
+            self.view = self.view_factory(self)
+            self.view.urlChanged.connect(self.on_url_changed); self.view.titleChanged.connect(self.on_title_changed)
+            self.view.loadFinished.connect(self.restore_scroll_position)
+            self.layout.addWidget(self.view)
+            # A tab about to receive a preloaded page is left blank rather than starting the same load again
+            if self.speculation is None and not self.restore_history(): self.view.setUrl(QUrl(self.url))
+        elif self.HAS_LIFECYCLE and self.lifecycle_state() != QWebEnginePage.LifecycleState.Active:
+            self.view.page().setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        return self.view
+
+    def save_history(self):
+        if not self.view: return self.history_state
+        data = QByteArray(); stream = QDataStream(data, QIODevice.OpenModeFlag.WriteOnly)
+        try: stream << self.view.history()
+        except TypeError: return None
+        return data
+
+    def restore_history(self):
+        history_state, self.history_state = self.history_state, None
+        if history_state is None: return False
+        stream = QDataStream(history_state)
+        try: stream >> self.view.history()
+        except TypeError: return False
+        return stream.status() == QDataStream.Status.Ok
+
+    def freeze(self):
+        if self.HAS_LIFECYCLE and self.lifecycle_state() == QWebEnginePage.LifecycleState.Active:
+            self.view.page().setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+
+    def discard(self):
+        if not self.view: return
+        self.scroll_position = self.view.page().scrollPosition()
+        self.url = self.view.url().toString() or self.url
+        self.title = self.view.title() or self.title
+        self.history_state = self.save_history()
+        self.layout.removeWidget(self.view)
+        self.view.deleteLater(); self.view = None
+
+    def memory_usage(self):
+        return process_rss(self.view.page().renderProcessPid()) if self.view else 0
+
+    def on_url_changed(self, qurl): self.url = qurl.toString()
+    def on_title_changed(self, title): self.title = title
+
+    def restore_scroll_position(self, success):
+        if success and self.scroll_position:
+            self.view.page().runJavaScript(f"window.scrollTo({self.scroll_position.x()}, {self.scroll_position.y()});")
+        self.scroll_position = None
 
 class Browser(QMainWindow):
     critical_error_signal = Signal(str)
+    bookmarks_loaded_signal = Signal(list)
+    cache_size_computed_signal = Signal(int)
+    BOOKMARK_MENU_CHUNK = 200
+    # Resources whose body size is visible (same-origin or Timing-Allow-Origin) and that were not transferred came from cache
+    PAGE_METRICS_JS = """
+        (function() {
+            var result = {cache_hits: 0, cache_lookups: 0}, resources = performance.getEntriesByType("resource");
+            resources.forEach(function(entry) {
+                if (entry.decodedBodySize > 0) { result.cache_lookups++; if (entry.transferSize === 0) result.cache_hits++; }
+            });
+            result.resources = resources.length;
+            var navigation = performance.getEntriesByType("navigation")[0];
+            if (navigation) {
+                result.ttfb_ms = navigation.responseStart;
+                result.dom_content_loaded_ms = navigation.domContentLoadedEventEnd || null;
+                result.load_event_ms = navigation.loadEventEnd || navigation.loadEventStart || null;
+                result.transfer_bytes = navigation.transferSize;
+            }
+            performance.getEntriesByType("paint").forEach(function(entry) { result[entry.name.replace(/-/g, "_") + "_ms"] = entry.startTime; });
+            return result;
+        })()
+    """
 
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Borgor Browser")
         self.setGeometry(100, 100, 1200, 800)
 
-        self.bookmarks = []
         self.current_theme_name = "light"
         self.javascript_enabled = True
         self.adblock_enabled = False
         self.homepage_url = "https://www.google.com"
+        self.tab_freeze_seconds = 5 * 60
+        self.tab_discard_minutes = 30
+        self.tab_memory_budget_mb = 0
+        self.session_dirty = False
+        self.restoring_session = False
+        self.segmented_downloads = True
+        self.download_engine = DownloadEngine()
         self.settings_dialog = None
-        self.ad_block_interceptor = AdBlockInterceptor()
+        self.history_dialog = None
+        self.site_data_dialog = None
+        self.site_data_container = ProfileManager.DEFAULT
+        self.download_dock = None
+        self.metrics_panel = None
+        self.page_loads = collections.deque(maxlen=MetricsPanel.MAX_ROWS)
+        self.icons_ready = False
+        self.startup_shown = False
+        self.data_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+        self.ad_block_interceptor = AdBlockInterceptor(); self.ad_block_interceptor.blocking = self.adblock_enabled
+        self.speculator = Speculator(self.ad_block_interceptor, self)
+        self.speculator.stats_changed.connect(self.on_speculation_stats)
         
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
         self.critical_error_signal.connect(self.critical_error)
+        self.setup_blocklist()
+        self.setup_profile()
+        self.history = HistoryStore(os.path.join(self.data_dir, "history.sqlite"), self.executor)
+        self.bookmark_store = BookmarkStore(os.path.join(self.data_dir, "bookmarks.jsonl"), self.executor)
+        self.bookmarks_loaded_signal.connect(self.bookmark_store.add_many)
+        self.suggestion_index = SuggestionIndex()
+        self.executor.submit(self._load_suggestions)
+        startup_trace.mark("profile and stores")
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -226,7 +2341,7 @@ class Browser(QMainWindow):
 
         self.tabs = QTabWidget(); self.tabs.setTabsClosable(True); self.tabs.setDocumentMode(True)
         self.tabs.tabCloseRequested.connect(self.close_tab)
-        self.tabs.currentChanged.connect(self.update_address_bar)
+        self.tabs.currentChanged.connect(self.on_current_tab_changed)
         self.layout.addWidget(self.tabs)
 
         self.nav_bar = QToolBar("Navigation"); self.nav_bar.setMovable(False); self.addToolBar(self.nav_bar)
@@ -240,15 +2355,31 @@ class Browser(QMainWindow):
         
         self.address_bar = QLineEdit(); self.address_bar.returnPressed.connect(self.navigate_to_url)
         self.nav_bar.addWidget(self.address_bar)
+        self.omnibox = Omnibox(self.address_bar, self.suggestion_index, self.executor, self.open_tab_entries)
+        self.omnibox.url_selected.connect(self.navigate_to_url)
+        self.omnibox.tab_selected.connect(self.switch_to_tab)
+        self.omnibox.predicted.connect(lambda url: self.speculator.hint(url, self.container_for(self.tabs.currentWidget()).profile))
         
         self.progress_bar = QProgressBar(); self.layout.addWidget(self.progress_bar); self.progress_bar.hide()
         
         self.setup_menus()
-        self.setup_download_manager()
         self.apply_theme("light")
-        self.add_new_tab()
+        startup_trace.mark("window chrome")
+        self.session_store = SessionStore(os.path.join(self.data_dir, "session.dat"))
+        if not self.restore_session(): self.add_new_tab()
+        startup_trace.mark("first navigation started")
 
-        QWebEngineProfile.defaultProfile().downloadRequested.connect(self.on_download_requested)
+        # Everything below is not needed for the first paint and runs one task per event-loop turn once the window is shown
+        self.idle_tasks = collections.deque([
+            ("icons", self.setup_icons), ("bookmarks", self.bookmark_store.load),
+            ("download dock", self.setup_download_manager), ("metrics panel", self.setup_metrics_panel),
+        ])
+
+        self.session_timer = QTimer(self); self.session_timer.setInterval(15 * 1000)
+        self.session_timer.timeout.connect(self.checkpoint_session); self.session_timer.start()
+
+        self.tab_lifecycle_timer = QTimer(self); self.tab_lifecycle_timer.setInterval(30 * 1000)
+        self.tab_lifecycle_timer.timeout.connect(self.check_tab_lifecycle); self.tab_lifecycle_timer.start()
 
     def setup_menus(self):
         self.menu_bar = self.menuBar()
@@ -256,110 +2387,530 @@ class Browser(QMainWindow):
         self.load_bookmarks_action = QAction("Load Bookmarks", self)
         self.save_bookmarks_action = QAction("Save Bookmarks", self)
         self.exit_action = QAction("Exit", self)
+        self.container_menu = file_menu.addMenu("New Tab in Container")
+        self.container_menu.aboutToShow.connect(self.populate_container_menu)
+        self.new_private_tab_action = QAction("New Private Tab", self); self.new_private_tab_action.setShortcut(QKeySequence("Ctrl+Shift+N"))
+        file_menu.addAction(self.new_private_tab_action); file_menu.addSeparator()
+        self.new_private_tab_action.triggered.connect(lambda: self.add_container_tab(ProfileManager.PRIVATE))
         file_menu.addAction(self.load_bookmarks_action); file_menu.addAction(self.save_bookmarks_action)
         file_menu.addSeparator(); file_menu.addAction(self.exit_action)
         self.load_bookmarks_action.triggered.connect(self.load_bookmarks)
         self.save_bookmarks_action.triggered.connect(self.save_bookmarks)
         self.exit_action.triggered.connect(self.close)
 
-        tools_menu = self.menu_bar.addMenu("&Tools")
-        settings_action = QAction("Settings...", self); tools_menu.addAction(settings_action)
+        history_menu = self.menu_bar.addMenu("&History")
+        self.show_history_action = QAction("Show History...", self); self.show_history_action.setShortcut(QKeySequence("Ctrl+H"))
+        history_menu.addAction(self.show_history_action)
+        self.show_history_action.triggered.connect(self.show_history_dialog)
+
+        self.tools_menu = self.menu_bar.addMenu("&Tools")
+        settings_action = QAction("Settings...", self); self.tools_menu.addAction(settings_action)
         settings_action.triggered.connect(self.show_settings_dialog)
 
         self.bookmark_menu = self.menu_bar.addMenu("&Bookmarks")
         self.bookmark_page_action = QAction("Bookmark This Page", self)
-        self.bookmark_menu.addAction(self.bookmark_page_action); self.bookmark_menu.addSeparator()
+        self.remove_bookmark_action = QAction("Remove Bookmark", self)
+        self.bookmark_menu.addAction(self.bookmark_page_action); self.bookmark_menu.addAction(self.remove_bookmark_action)
+        self.bookmark_menu.aboutToHide.connect(self.speculator.cancel_hint)
+        self.bookmark_menu.addSeparator()
+        self.bookmark_folders_separator = self.bookmark_menu.addSeparator()
         self.bookmark_menu.aboutToShow.connect(self.update_bookmark_menu)
         self.bookmark_page_action.triggered.connect(self.add_bookmark)
+        self.remove_bookmark_action.triggered.connect(self.remove_bookmark)
+
+        self.bookmark_folder_menus = {}
+        self.bookmark_actions = {}
+        self.bookmark_more_menus = {}
+        self.populated_bookmark_menus = set()
+        self.bookmark_store.bookmark_added.connect(self.on_bookmark_added)
+        self.bookmark_store.bookmark_removed.connect(self.on_bookmark_removed)
+        self.bookmark_store.bookmarks_reset.connect(self.on_bookmarks_reset)
+        self.bookmark_store.bookmark_added.connect(lambda url, title, folder: self.suggestion_index.update(url, title, bookmarked=True))
+        self.bookmark_store.bookmark_removed.connect(lambda url, folder: self.suggestion_index.update(url, bookmarked=False))
 
     def show_settings_dialog(self):
         if not self.settings_dialog:
             self.settings_dialog = SettingsDialog(self)
             self.settings_dialog.javascript_toggled.connect(self.set_javascript_enabled)
             self.settings_dialog.adblock_toggled.connect(self.set_adblock_enabled)
+            self.settings_dialog.blocklist_file_selected.connect(self.import_blocklist)
             self.settings_dialog.homepage_changed.connect(self.set_homepage)
-            self.settings_dialog.clear_data_requested.connect(self.clear_Browse_data)
+            self.settings_dialog.tab_discard_minutes_changed.connect(self.set_tab_discard_minutes)
+            self.settings_dialog.tab_memory_budget_changed.connect(self.set_tab_memory_budget)
+            self.settings_dialog.speculation_toggled.connect(self.speculator.set_enabled)
+            self.settings_dialog.speculation_pages_changed.connect(lambda pages: self.speculator.set_budget(max_pages=pages))
+            self.settings_dialog.speculation_memory_changed.connect(lambda megabytes: self.speculator.set_budget(memory_cap_mb=megabytes))
+            self.settings_dialog.clear_data_requested.connect(self.show_site_data_dialog)
+            self.settings_dialog.cache_mode_changed.connect(self.set_container_cache_mode)
+            self.settings_dialog.cache_size_changed.connect(self.set_container_cache_size)
+            self.settings_dialog.container_added.connect(self.add_container)
+            self.settings_dialog.container_removed.connect(self.remove_container)
+            self.settings_dialog.segmented_downloads_toggled.connect(self.set_segmented_downloads)
+            self.settings_dialog.max_active_downloads_changed.connect(self.download_engine.set_max_active)
+            self.settings_dialog.download_segments_changed.connect(self.set_download_segments)
+            self.settings_dialog.download_rate_limit_changed.connect(lambda kb: self.download_engine.bucket.set_rate(kb * 1024))
+            self.settings_dialog.per_download_rate_limit_changed.connect(self.set_per_download_rate_limit)
             self.settings_dialog.theme_changed.connect(self.apply_theme)
             self.settings_dialog.custom_theme_path_selected.connect(self.apply_custom_theme)
         
-        self.settings_dialog.set_initial_values(self.javascript_enabled, self.adblock_enabled, self.homepage_url, self.current_theme_name)
+        self.settings_dialog.set_initial_values(self.javascript_enabled, self.adblock_enabled, self.homepage_url, self.current_theme_name,
+                                                self.tab_discard_minutes, self.tab_memory_budget_mb, self.container_settings(),
+                                                self.download_settings(), (self.speculator.enabled, self.speculator.max_pages, self.speculator.memory_cap_mb))
         self.settings_dialog.show(); self.settings_dialog.raise_(); self.settings_dialog.activateWindow()
 
+    def show_history_dialog(self):
+        if not self.history_dialog:
+            self.history_dialog = HistoryDialog(self, self.history, self.executor)
+            self.history_dialog.url_activated.connect(lambda url: self.add_new_tab(url=url))
+            self.history_dialog.clear_history_requested.connect(self.clear_history)
+        self.history_dialog.refresh()
+        self.history_dialog.show(); self.history_dialog.raise_(); self.history_dialog.activateWindow()
+
+    def clear_history(self):
+        if QMessageBox.question(self, "Clear History", "Delete all browsing history?") != QMessageBox.StandardButton.Yes: return
+        # Suggestions and the pages preloaded from them must not outlive the history they came from
+        self.speculator.cancel_hint()
+        for speculation in list(self.speculator.speculations.values()): self.speculator.evict(speculation)
+        rows = [(url, title, 0, None, True) for url, (title, folder) in self.bookmark_store.bookmarks.items()]
+        future = self.executor.submit(self._clear_history, rows)
+        future.add_done_callback(lambda f: self.history_dialog and self.history_dialog.results_ready.emit(self.history_dialog.query_generation, []))
+
     def set_javascript_enabled(self, enabled):
         self.javascript_enabled = enabled
+        self.speculator.javascript_enabled = enabled
         for i in range(self.tabs.count()):
-            if browser := self.tabs.widget(i):
+            if browser := self.tabs.widget(i).view:
                 browser.settings().setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, enabled)
 
     def set_adblock_enabled(self, enabled):
         self.adblock_enabled = enabled
-        interceptor = self.ad_block_interceptor if enabled else None
-        QWebEngineProfile.defaultProfile().setUrlRequestInterceptor(interceptor)
+        self.ad_block_interceptor.blocking = enabled
+
+    def setup_blocklist(self):
+        self.blocklist_compiler = BlocklistCompiler(os.path.join(self.data_dir, "adblock"), AdBlockInterceptor.DEFAULT_AD_DOMAINS)
+        if snapshot := self.blocklist_compiler.open_snapshot(): self.ad_block_interceptor.blocklist = snapshot
+        if self.blocklist_compiler.sources():
+            self.executor.submit(self._compile_blocklist if not self.blocklist_compiler.is_current() else self._load_url_filters)
+
+    def import_blocklist(self, file_name):
+        self.executor.submit(self._compile_blocklist, file_name)
+
+    def _compile_blocklist(self, file_name=None):
+        try:
+            compiler = self.blocklist_compiler
+            self.ad_block_interceptor.blocklist = compiler.add_source(file_name) if file_name else compiler.compile()
+            self._load_url_filters()
+            if compiler.warnings: self.critical_error_signal.emit("\n".join(compiler.warnings))
+        except Exception as e: self.critical_error_signal.emit(f"Failed to compile blocklist: {e}")
+
+    def _load_url_filters(self):
+        try: self.ad_block_interceptor.url_filters = self.blocklist_compiler.load_url_filters()
+        except Exception as e: self.critical_error_signal.emit(f"Failed to load URL filters: {e}")
 
     def set_homepage(self, url):
         self.homepage_url = url
 
+    def set_tab_discard_minutes(self, minutes):
+        self.tab_discard_minutes = minutes
+
+    def set_tab_memory_budget(self, megabytes):
+        self.tab_memory_budget_mb = megabytes
+
+    def setup_profile(self):
+        # Named profiles keep cookies and the disk cache between launches, each container under its own storage path
+        # The interceptor stays installed with blocking off so the metrics panel can still count requests per origin
+        self.profiles = ProfileManager(self.data_dir, self.ad_block_interceptor, self)
+        self.profiles.profile_created.connect(self.on_profile_created)
+        self.profile = self.profiles.get(ProfileManager.DEFAULT).profile
+        self.cache_size_computed_signal.connect(self.update_site_data_statistics)
+
+    def on_profile_created(self, container):
+        container.profile.downloadRequested.connect(lambda download_item, container=container: self.on_download_requested(download_item, container))
+
+    def container_for(self, tab):
+        return self.profiles.get(tab.container if tab else ProfileManager.DEFAULT)
+
+    def set_container_cache_mode(self, name, mode):
+        try: self.profiles.set_cache(name, mode=mode)
+        except OSError as e: self.critical_error(f"Could not save container settings: {e}")
+
+    def set_container_cache_size(self, name, megabytes):
+        try: self.profiles.set_cache(name, size_mb=megabytes)
+        except OSError as e: self.critical_error(f"Could not save container settings: {e}")
+
+    def container_settings(self):
+        return {name: (settings["cache_mode"], settings["cache_size_mb"]) for name, settings in self.profiles.settings.items()}
+
+    def add_container(self, name):
+        try:
+            if not self.profiles.add(name.strip()): self.critical_error(f"A container called \"{name}\" already exists or the name is reserved.")
+        except OSError as e: self.critical_error(f"Could not save container settings: {e}")
+        if self.settings_dialog: self.settings_dialog.set_containers(self.container_settings())
+
+    def remove_container(self, name):
+        tabs = [tab for tab in map(self.tabs.widget, range(self.tabs.count())) if tab.container == name]
+        if tabs and QMessageBox.question(self, "Remove Container", f"Close {len(tabs)} tab(s) and delete all data in \"{name}\"?") != QMessageBox.StandardButton.Yes: return
+        if len(tabs) == self.tabs.count(): self.add_new_tab()
+        for tab in tabs: self.tabs.removeTab(self.tabs.indexOf(tab)); tab.deleteLater()
+        if container := self.profiles.profiles.get(name): self.speculator.discard_profile(container.profile)
+        try: paths = self.profiles.remove(name)
+        except OSError as e: self.critical_error(f"Could not save container settings: {e}"); return
+        # The profile is deleted after its pages, so its files are removed once the event loop has let it go
+        if paths: QTimer.singleShot(0, lambda: self.executor.submit(self._remove_container_data, paths))
+        self.session_dirty = True
+        if self.settings_dialog: self.settings_dialog.set_containers(self.container_settings())
+
+    def _remove_container_data(self, paths):
+        for path in paths: shutil.rmtree(path, ignore_errors=True)
+
+    def collect_page_metrics(self, browser, load, container):
+        browser.page().runJavaScript(self.PAGE_METRICS_JS, 0, lambda result, load=load: self.record_page_metrics(load, result, container))
+
+    def record_page_metrics(self, load, result, container):
+        if isinstance(result, dict):
+            container.cache_hits += int(result.get("cache_hits") or 0); container.cache_lookups += int(result.get("cache_lookups") or 0)
+        load.set_timing(result)
+        self.page_loads.append(load)
+        if self.metrics_panel: self.metrics_panel.add_load(load)
+
+    def on_speculation_stats(self, stats):
+        if self.metrics_panel: self.metrics_panel.set_speculation_stats(stats)
+
+    def swap_in_speculation(self, tab, speculation):
+        tab.speculation = speculation
+        view = tab.activate()
+        tab.speculation = None
+        # setPage re-emits urlChanged and titleChanged, so history, the tab title and the address bar follow the new page
+        old_page = view.page(); speculation.page.setParent(view); view.setPage(speculation.page); old_page.deleteLater()
+        if speculation.load.finished: self.collect_page_metrics(view, speculation.load, self.container_for(tab))
+        else: tab.page_load, tab.load_progress = speculation.load, speculation.progress
+        if tab is self.tabs.currentWidget(): self.update_progress_bar(tab)
+
+    def setup_metrics_panel(self):
+        self.metrics_panel = MetricsPanel(self, self.ad_block_interceptor.request_counter)
+        for load in self.page_loads: self.metrics_panel.add_load(load)
+        self.metrics_panel.set_speculation_stats(self.speculator.stats())
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.metrics_panel)
+        self.metrics_panel.hide()
+        metrics_action = self.metrics_panel.toggleViewAction(); metrics_action.setShortcut(QKeySequence("Ctrl+Shift+M"))
+        self.tools_menu.addAction(metrics_action)
+        self.metrics_panel.export_requested.connect(self.export_metrics)
+        self.metrics_panel.clear_requested.connect(self.clear_metrics)
+
+    def clear_metrics(self):
+        self.page_loads.clear(); self.ad_block_interceptor.request_counter.clear(); self.metrics_panel.clear()
+
+    def export_metrics(self, file_name, table):
+        loads = [load.as_dict() for load in self.page_loads]
+        self.executor.submit(self._write_metrics, file_name, table, loads, self.ad_block_interceptor.request_counter.export(), {"speculation": self.speculator.stats()})
+
+    def _write_metrics(self, file_name, table, loads, origins, summary=None):
+        try: write_metrics(file_name, table, loads, origins, summary=summary)
+        except Exception as e: self.critical_error_signal.emit(f"Failed to export metrics: {e}")
+
+    def show_site_data_dialog(self):
+        if not self.site_data_dialog:
+            self.site_data_dialog = SiteDataDialog(self)
+            self.site_data_dialog.clear_origins_requested.connect(self.clear_site_data)
+            self.site_data_dialog.clear_cache_requested.connect(self.clear_http_cache)
+            self.site_data_dialog.clear_all_requested.connect(self.clear_Browse_data)
+            self.site_data_dialog.container_changed.connect(self.set_site_data_container)
+            self.site_data_dialog.refresh_requested.connect(self.refresh_site_data_dialog)
+        self.site_data_container = self.tabs.currentWidget().container if self.tabs.currentWidget() else ProfileManager.DEFAULT
+        private = [ProfileManager.PRIVATE] if ProfileManager.PRIVATE in self.profiles.profiles else []
+        self.site_data_dialog.set_containers(self.profiles.names() + private, self.site_data_container)
+        self.refresh_site_data_dialog()
+        self.site_data_dialog.show(); self.site_data_dialog.raise_(); self.site_data_dialog.activateWindow()
+
+    def set_site_data_container(self, name):
+        self.site_data_container = name; self.refresh_site_data_dialog()
+
+    def site_data_profile(self):
+        return self.profiles.get(self.site_data_container)
+
+    def refresh_site_data_dialog(self):
+        container = self.site_data_profile()
+        self.site_data_dialog.set_origins(container.cookies_by_host.keys())
+        self.update_site_data_statistics(0)
+        if container.cache_mode == "disk" and not container.off_the_record: self.executor.submit(self._compute_cache_size, container.profile.cachePath())
+
+    def _compute_cache_size(self, path):
+        total = 0
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                try: total += os.path.getsize(os.path.join(root, name))
+                except OSError: pass
+        self.cache_size_computed_signal.emit(total)
+
+    def update_site_data_statistics(self, cache_bytes):
+        if self.site_data_dialog:
+            container = self.site_data_profile()
+            self.site_data_dialog.set_statistics(container.cache_mode, cache_bytes, container.cache_hits, container.cache_lookups)
+
+    def clear_site_data(self, hosts):
+        container = self.site_data_profile()
+        for host in hosts:
+            for cookie in list(container.cookies_by_host.pop(host, {}).values()): container.profile.cookieStore().deleteCookie(cookie)
+        self.refresh_site_data_dialog()
+
+    def clear_http_cache(self):
+        container = self.site_data_profile()
+        container.profile.clearHttpCache()
+        container.cache_hits, container.cache_lookups = 0, 0
+        self.refresh_site_data_dialog()
+
     def clear_Browse_data(self):
-        profile = QWebEngineProfile.defaultProfile()
-        profile.clearHttpCache()
-        profile.cookieStore().deleteAllCookies()
+        container = self.site_data_profile()
+        container.profile.clearHttpCache()
+        container.profile.cookieStore().deleteAllCookies()
+        container.cookies_by_host.clear()
+        container.cache_hits, container.cache_lookups = 0, 0
+        if self.site_data_dialog: self.refresh_site_data_dialog()
         QMessageBox.information(self, "Data Cleared", "Browse cache and cookies have been cleared.")
 
     def apply_custom_theme(self, file_path):
         try:
-            with open(file_path, 'r') as f: self.setStyleSheet(f.read())
+            with open(file_path, 'r') as f: self.set_stylesheet(f.read())
             self.current_theme_name = "custom"
         except Exception as e:
             self.critical_error(f"Could not load theme: {e}")
 
     def setup_download_manager(self):
+        if self.download_dock: return
         self.download_dock = QDockWidget("Downloads", self)
         self.download_dock.setAllowedAreas(Qt.DockWidgetArea.BottomDockWidgetArea)
-        self.download_list = QListWidget()
+        self.download_model = DownloadListModel(self)
+        self.download_list = QListView(); self.download_list.setModel(self.download_model)
+        self.download_list.setItemDelegate(DownloadItemDelegate(self.download_list))
+        self.download_list.setUniformItemSizes(True)
+        self.download_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.download_dock.setWidget(self.download_list)
         self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.download_dock)
         self.download_dock.hide()
 
-    def on_download_requested(self, download_item: QWebEngineDownloadRequest):
+        self.engine_downloads = {}
+        self.download_engine.job_changed.connect(self.on_download_job_changed)
+        self.download_list.customContextMenuRequested.connect(self.show_download_menu)
+        self.download_list.doubleClicked.connect(lambda index: self.open_download(index.data(DownloadListModel.RecordRole)))
+
+    def on_download_job_changed(self, job):
+        if record := self.engine_downloads.get(id(job)): self.download_model.record_changed(record)
+
+    def show_download_menu(self, position):
+        index = self.download_list.indexAt(position)
+        record = index.data(DownloadListModel.RecordRole) if index.isValid() else None
+        state = record.state() if record else None
+        menu = QMenu(self)
+        if state in ("Queued", "Downloading"): menu.addAction("Pause", record.pause)
+        if record and record.can_resume(): menu.addAction("Resume", record.resume)
+        if state in ("Queued", "Downloading", "Paused", "Failed"): menu.addAction("Cancel", record.cancel)
+        if state == "Completed":
+            menu.addAction("Open", lambda: self.open_download(record))
+            menu.addAction("Show in Folder", lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.dirname(record.path))))
+        if record: menu.addSeparator()
+        menu.addAction("Clear Finished", self.download_model.remove_finished)
+        menu.exec(self.download_list.viewport().mapToGlobal(position))
+
+    def open_download(self, record):
+        if record and record.state() == "Completed": QDesktopServices.openUrl(QUrl.fromLocalFile(record.path))
+
+    def download_settings(self):
+        engine = self.download_engine
+        return (self.segmented_downloads, engine.max_active, engine.segments_per_download,
+                engine.bucket.rate // 1024, engine.per_download_rate_limit // 1024)
+
+    def set_segmented_downloads(self, enabled):
+        self.segmented_downloads = enabled
+
+    def set_download_segments(self, count):
+        self.download_engine.segments_per_download = count
+
+    def set_per_download_rate_limit(self, kilobytes):
+        self.download_engine.per_download_rate_limit = kilobytes * 1024
+        for job in self.download_engine.jobs: job.bucket.set_rate(kilobytes * 1024)
+
+    def download_headers(self, container):
+        return {"User-Agent": container.profile.httpUserAgent()}
+
+    def add_download(self, record):
+        self.download_model.add(record)
+        self.download_dock.show()
+
+    def on_download_requested(self, download_item: QWebEngineDownloadRequest, container):
+        self.setup_download_manager()
         save_path, _ = QFileDialog.getSaveFileName(self, "Save File", download_item.suggestedFileName())
-        if save_path:
-            download_item.setPath(save_path); download_item.accept()
-            item_widget = DownloadItemWidget(download_item)
-            list_item = QListWidgetItem(); list_item.setSizeHint(item_widget.sizeHint())
-            self.download_list.addItem(list_item)
-            self.download_list.setItemWidget(list_item, item_widget)
-            self.download_dock.show()
+        if save_path and self.segmented_downloads and download_item.url().scheme() in ("http", "https") and not download_item.isSavePageDownload():
+            download_item.cancel()
+            job = self.download_engine.enqueue(download_item.url().toString(), save_path, self.download_headers(container), container.cookie_snapshot())
+            record = self.engine_downloads[id(job)] = EngineDownload(self.download_engine, job)
+            self.add_download(record)
+        elif save_path:
+            download_item.setDownloadDirectory(os.path.dirname(save_path)); download_item.setDownloadFileName(os.path.basename(save_path))
+            download_item.accept()
+            record = BrowserDownload(download_item)
+            download_item.stateChanged.connect(lambda state, record=record: self.download_model.record_changed(record))
+            download_item.isPausedChanged.connect(lambda paused, record=record: self.download_model.record_changed(record))
+            self.add_download(record)
         
+    def run_idle_task(self):
+        if not self.idle_tasks: startup_trace.mark("idle setup done"); return
+        label, task = self.idle_tasks.popleft()
+        try: task()
+        except Exception as e: self.critical_error_signal.emit(f"Failed to set up {label}: {e}")
+        startup_trace.mark(f"idle: {label}")
+        QTimer.singleShot(0, self.run_idle_task)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.startup_shown:
+            self.startup_shown = True; startup_trace.mark("window shown")
+            QTimer.singleShot(0, self.run_idle_task)
+
     def setup_icons(self):
+        self.icons_ready = True
         self.back_action.setIcon(QIcon.fromTheme("go-previous")); self.forward_action.setIcon(QIcon.fromTheme("go-next"))
         self.reload_action.setIcon(QIcon.fromTheme("view-refresh")); self.new_tab_action.setIcon(QIcon.fromTheme("document-new"))
         self.load_bookmarks_action.setIcon(QIcon.fromTheme("document-open")); self.save_bookmarks_action.setIcon(QIcon.fromTheme("document-save"))
         self.exit_action.setIcon(QIcon.fromTheme("application-exit")); self.bookmark_page_action.setIcon(QIcon.fromTheme("user-bookmarks"))
 
     def apply_theme(self, theme_name):
+        stylesheet, icon_theme = (DARK_MODE_QSS, "breeze-dark") if theme_name == "dark" else (LIGHT_MODE_QSS, "breeze")
         self.current_theme_name = theme_name
-        is_dark_mode = theme_name == "dark"
-        if is_dark_mode:
-            self.setStyleSheet(DARK_MODE_QSS); QIcon.setThemeName("breeze-dark")
-        else:
-            self.setStyleSheet(LIGHT_MODE_QSS); QIcon.setThemeName("breeze")
-        self.setup_icons()
+        self.set_stylesheet(stylesheet)
+        if QIcon.themeName() != icon_theme:
+            QIcon.setThemeName(icon_theme)
+            if self.icons_ready: self.setup_icons()
+
+    def set_stylesheet(self, stylesheet):
+        # Setting a stylesheet re-polishes every widget in the window, so skip it when nothing changed and repaint once afterwards
+        if stylesheet == self.styleSheet(): return
+        self.setUpdatesEnabled(False)
+        try: self.setStyleSheet(stylesheet)
+        finally: self.setUpdatesEnabled(True)
 
-    def add_new_tab(self, url=None, label="New Tab"):
+    def add_new_tab(self, url=None, label="New Tab", background=False, container=ProfileManager.DEFAULT):
         if url is None: url = self.homepage_url
+        tab = BrowserTab(url, label, self.create_view, container)
+        index = self.tabs.addTab(tab, label)
+        if container != ProfileManager.DEFAULT:
+            self.tabs.tabBar().setTabTextColor(index, QColor(self.profiles.get(container).color()))
+            self.tabs.setTabToolTip(index, f"Container: {container}")
+        if not background: self.tabs.setCurrentIndex(index)
+        return tab
+
+    def add_container_tab(self, container):
+        self.add_new_tab(container=container)
+
+    def populate_container_menu(self):
+        self.container_menu.clear()
+        for name in self.profiles.names():
+            action = self.container_menu.addAction(name.capitalize() if name == ProfileManager.DEFAULT else name)
+            action.triggered.connect(lambda checked=False, name=name: self.add_container_tab(name))
+        self.container_menu.addSeparator()
+        self.container_menu.addAction("Manage Containers...", self.show_settings_dialog)
+
+    def create_view(self, tab):
         browser = QWebEngineView()
+        browser.setPage(QWebEnginePage(self.container_for(tab).profile, browser))
         browser.settings().setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, self.javascript_enabled)
-        browser.setUrl(QUrl(url)); index = self.tabs.addTab(browser, label); self.tabs.setCurrentIndex(index)
         browser.urlChanged.connect(lambda q, b=browser: self.update_address_bar_on_change(q, b))
-        browser.titleChanged.connect(lambda t, i=index: self.tabs.setTabText(i, t))
-        browser.loadStarted.connect(self.on_load_started); browser.loadProgress.connect(self.on_load_progress)
-        browser.loadFinished.connect(self.on_load_finished)
+        browser.titleChanged.connect(lambda t, tab=tab: self.tabs.setTabText(self.tabs.indexOf(tab), t))
+        # Private tabs leave nothing behind, so they are kept out of history and the address bar suggestions
+        if tab.container != ProfileManager.PRIVATE:
+            browser.urlChanged.connect(lambda q, b=browser: self.record_visit(q.toString(), b.title()))
+            browser.titleChanged.connect(lambda t, b=browser: self.record_title(b.url().toString(), t))
+        browser.loadStarted.connect(lambda tab=tab: self.on_load_started(tab))
+        browser.loadProgress.connect(lambda progress, tab=tab: self.on_load_progress(tab, progress))
+        browser.loadFinished.connect(lambda ok, tab=tab: self.on_load_finished(tab, ok))
+        return browser
+
+    def record_visit(self, url, title):
+        self.session_dirty = True
+        self.history.record_visit(url, title)
+        if url.startswith(HistoryStore.RECORDED_SCHEMES): self.suggestion_index.update(url, title, visits=1, last_visit=time.time())
+
+    def record_title(self, url, title):
+        self.session_dirty = True
+        self.history.update_title(url, title)
+        if url in self.suggestion_index.entries: self.suggestion_index.update(url, title)
+
+    def open_tab_entries(self):
+        current = self.tabs.currentWidget()
+        return [(tab.url, tab.title, tab) for tab in map(self.tabs.widget, range(self.tabs.count())) if tab is not current]
+
+    def switch_to_tab(self, tab):
+        if self.tabs.indexOf(tab) != -1: self.tabs.setCurrentWidget(tab)
+        else: self.navigate_to_url(tab.url)
 
     def close_tab(self, index):
-        if self.tabs.count() > 1: self.tabs.removeTab(index)
+        if self.tabs.count() > 1:
+            tab = self.tabs.widget(index); self.tabs.removeTab(index); tab.deleteLater()
+            self.session_dirty = True
+            # The shared private profile, and with it every private cookie and cache entry, goes with the last private tab
+            if tab.container == ProfileManager.PRIVATE and not any(self.tabs.widget(i).container == ProfileManager.PRIVATE for i in range(self.tabs.count())):
+                self.speculator.discard_profile(self.profiles.get(ProfileManager.PRIVATE).profile)
+                self.profiles.release(ProfileManager.PRIVATE)
         else: self.close()
 
-    def current_browser(self): return self.tabs.currentWidget()
+    def on_current_tab_changed(self, index):
+        if self.restoring_session: return
+        if tab := self.tabs.widget(index): tab.activate()
+        self.update_progress_bar(tab)
+        self.update_address_bar()
+        self.session_dirty = True
+
+    def session_snapshot(self):
+        tabs = [self.tabs.widget(i) for i in range(self.tabs.count())]
+        current = self.tabs.currentWidget()
+        saved = [tab for tab in tabs if tab.container != ProfileManager.PRIVATE]
+        return SessionStore.serialize([(tab.url, tab.title, tab.save_history(), tab.container) for tab in saved], saved.index(current) if current in saved else 0)
+
+    def checkpoint_session(self):
+        if not self.session_dirty: return
+        self.session_dirty = False
+        self.executor.submit(self._write_session, self.session_snapshot(), self.session_store.next_sequence())
+
+    def _write_session(self, data, sequence):
+        try: self.session_store.write(data, sequence)
+        except OSError as e: self.critical_error_signal.emit(f"Failed to save session: {e}")
+
+    def restore_session(self):
+        tabs, current_index = self.session_store.read()
+        if not tabs: return False
+        self.restoring_session = True
+        try:
+            for url, title, history_state, container in tabs:
+                if container not in self.profiles.settings: container = ProfileManager.DEFAULT
+                tab = self.add_new_tab(url, title or url, background=True, container=container); tab.history_state = history_state
+        finally: self.restoring_session = False
+        index = max(0, min(current_index, self.tabs.count() - 1))
+        if index == self.tabs.currentIndex(): self.on_current_tab_changed(index)
+        else: self.tabs.setCurrentIndex(index)
+        return True
+
+    def check_tab_lifecycle(self):
+        now = time.monotonic()
+        current = self.tabs.currentWidget()
+        background = sorted((self.tabs.widget(i) for i in range(self.tabs.count())), key=lambda tab: tab.last_active)
+        background = [tab for tab in background if tab is not current and tab.is_loaded()]
+        for tab in background:
+            idle = now - tab.last_active
+            if self.tab_discard_minutes and idle > self.tab_discard_minutes * 60: tab.discard()
+            elif idle > self.tab_freeze_seconds: tab.freeze()
+        if self.tab_memory_budget_mb:
+            background = [tab for tab in background if tab.is_loaded()]
+            loaded = background + ([current] if current and current.is_loaded() else [])
+            # Tabs of the same site can share a renderer process, so count each process once
+            pids = {tab.view.page().renderProcessPid() for tab in loaded}
+            usage = process_rss(os.getpid()) + sum(map(process_rss, pids))
+            budget = self.tab_memory_budget_mb * 1024 * 1024
+            for tab in background:
+                if usage <= budget: break
+                usage -= tab.memory_usage(); tab.discard()
+
+    def current_browser(self):
+        if tab := self.tabs.currentWidget(): return tab.activate()
+        return None
     def back(self):
         if b := self.current_browser(): b.back()
     def forward(self):
@@ -367,11 +2918,18 @@ class Browser(QMainWindow):
     def reload(self):
         if b := self.current_browser(): b.reload()
 
-    def navigate_to_url(self):
-        url = self.address_bar.text().strip()
+    def navigate_to_url(self, url=None):
+        if url is None:
+            if self.omnibox.is_selecting(): return
+            url = self.address_bar.text()
+        url = url.strip()
         if not url: return
         if not url.startswith(("http://", "https://")): url = "https://" + url
-        if b := self.current_browser(): b.setUrl(QUrl(url))
+        tab = self.tabs.currentWidget()
+        # A tab that has only shown its start page loses nothing when its page is replaced by the preloaded one
+        adopt = tab is not None and (tab.view is None or tab.view.history().count() <= 1)
+        if tab and (speculation := self.speculator.claim(url, self.container_for(tab).profile, adopt)): self.swap_in_speculation(tab, speculation)
+        elif b := self.current_browser(): b.setUrl(QUrl(url))
 
     def update_address_bar_on_change(self, qurl, browser):
         if browser == self.current_browser():
@@ -380,18 +2938,120 @@ class Browser(QMainWindow):
         if b := self.current_browser(): self.update_address_bar_on_change(b.url(), b)
 
     def add_bookmark(self):
-        if b := self.current_browser():
-            url = b.url().toString(); title = b.title()
-            if (url, title) not in self.bookmarks: self.bookmarks.append((url, title))
+        if b := self.current_browser(): self.bookmark_store.add(b.url().toString(), b.title())
+
+    def remove_bookmark(self):
+        if b := self.current_browser(): self.bookmark_store.remove(b.url().toString())
 
     def update_bookmark_menu(self):
-        for action in self.bookmark_menu.actions()[2:]: self.bookmark_menu.removeAction(action)
-        for url, title in self.bookmarks:
-            action = QAction(title, self); action.setData(url)
-            action.triggered.connect(self.navigate_bookmark); self.bookmark_menu.addAction(action)
+        url = b.url().toString() if (b := self.current_browser()) else ""
+        self.remove_bookmark_action.setEnabled(url in self.bookmark_store)
+        self.populate_bookmark_menu("")
+
+    def bookmark_folder_menu(self, folder):
+        if not folder: return self.bookmark_menu
+        if folder not in self.bookmark_folder_menus:
+            menu = QMenu(folder, self.bookmark_menu)
+            menu.aboutToShow.connect(lambda folder=folder: self.populate_bookmark_menu(folder))
+            following = [name for name in self.bookmark_folder_menus if name > folder]
+            before = self.bookmark_folder_menus[min(following)].menuAction() if following else self.bookmark_folders_separator
+            self.bookmark_menu.insertMenu(before, menu)
+            self.bookmark_folder_menus[folder] = menu
+        return self.bookmark_folder_menus[folder]
+
+    def create_bookmark_action(self, url, title):
+        action = QAction(title or url, self); action.setData(url)
+        action.triggered.connect(self.navigate_bookmark)
+        action.hovered.connect(self.on_bookmark_hovered)
+        self.bookmark_actions[url] = action
+        return action
+
+    def populate_bookmark_menu(self, folder):
+        if folder in self.populated_bookmark_menus: return
+        menu = self.bookmark_folder_menu(folder)
+        # Opening a menu builds at most one chunk of actions, the rest wait in "More Bookmarks" submenus filled when shown
+        menu.addActions([self.create_bookmark_action(url, title) for url, title in self.bookmark_store.in_folder(folder, 0, self.BOOKMARK_MENU_CHUNK)])
+        if self.bookmark_store.folder_size(folder) > self.BOOKMARK_MENU_CHUNK: self.add_more_bookmarks_menu(folder)
+        self.populated_bookmark_menus.add(folder)
+
+    def add_more_bookmarks_menu(self, folder):
+        menu = self.bookmark_folder_menu(folder)
+        more = self.bookmark_more_menus[folder] = QMenu("More Bookmarks", menu); menu.addMenu(more)
+        more.aboutToShow.connect(lambda: self.populate_more_bookmarks_menu(folder))
+
+    def populate_more_bookmarks_menu(self, folder):
+        more, chunk, size = self.bookmark_more_menus[folder], self.BOOKMARK_MENU_CHUNK, self.bookmark_store.folder_size(folder)
+        if more.actions(): return
+        for start in range(chunk, size, chunk):
+            menu = QMenu(f"{start + 1}-{min(start + chunk, size)}", more); more.addMenu(menu)
+            menu.aboutToShow.connect(lambda menu=menu, start=start: self.populate_bookmark_chunk(menu, folder, start))
+
+    def populate_bookmark_chunk(self, menu, folder, start):
+        if menu.actions(): return
+        menu.addActions([self.create_bookmark_action(url, title) for url, title in self.bookmark_store.in_folder(folder, start, start + self.BOOKMARK_MENU_CHUNK)])
+
+    def remove_more_bookmarks_menu(self, folder):
+        more = self.bookmark_more_menus.pop(folder)
+        if more.actions():
+            for url, title in self.bookmark_store.in_folder(folder, self.BOOKMARK_MENU_CHUNK):
+                if action := self.bookmark_actions.pop(url, None): action.deleteLater()
+        self.bookmark_folder_menu(folder).removeAction(more.menuAction()); more.deleteLater()
+
+    def reset_bookmark_menu(self, folder):
+        menu = self.bookmark_folder_menu(folder)
+        if folder in self.bookmark_more_menus: self.remove_more_bookmarks_menu(folder)
+        for url, title in self.bookmark_store.in_folder(folder, 0, self.BOOKMARK_MENU_CHUNK):
+            if action := self.bookmark_actions.pop(url, None): menu.removeAction(action); action.deleteLater()
+        self.populated_bookmark_menus.discard(folder)
+
+    def on_bookmark_added(self, url, title, folder):
+        menu = self.bookmark_folder_menu(folder)
+        if folder not in self.populated_bookmark_menus: return
+        # New bookmarks go last, so once a menu overflows only its "More Bookmarks" chunks need rebuilding
+        if folder in self.bookmark_more_menus: self.remove_more_bookmarks_menu(folder); self.add_more_bookmarks_menu(folder)
+        elif self.bookmark_store.folder_size(folder) > self.BOOKMARK_MENU_CHUNK: self.add_more_bookmarks_menu(folder)
+        else: menu.addAction(self.create_bookmark_action(url, title))
+
+    def on_bookmark_removed(self, url, folder):
+        if action := self.bookmark_actions.pop(url, None):
+            self.bookmark_folder_menu(folder).removeAction(action); action.deleteLater()
+        # Removing from an overflowing menu shifts every chunk after it, the menu is rebuilt the next time it opens
+        if folder in self.bookmark_more_menus: self.reset_bookmark_menu(folder)
+        if folder and folder not in self.bookmark_store.folder_index and folder in self.bookmark_folder_menus:
+            menu = self.bookmark_folder_menus.pop(folder); self.populated_bookmark_menus.discard(folder)
+            self.bookmark_menu.removeAction(menu.menuAction()); menu.deleteLater()
+
+    def on_bookmarks_reset(self):
+        for action in self.bookmark_actions.values():
+            self.bookmark_menu.removeAction(action); action.deleteLater()
+        for menu in self.bookmark_folder_menus.values():
+            self.bookmark_menu.removeAction(menu.menuAction()); menu.deleteLater()
+        if more := self.bookmark_more_menus.get(""): self.bookmark_menu.removeAction(more.menuAction()); more.deleteLater()
+        self.bookmark_actions, self.bookmark_folder_menus, self.bookmark_more_menus = {}, {}, {}
+        self.populated_bookmark_menus.clear()
+        for folder in self.bookmark_store.folders(): self.bookmark_folder_menu(folder)
+        rows = [(url, title, 0, None, True) for url, (title, folder) in self.bookmark_store.bookmarks.items()]
+        self.executor.submit(self.suggestion_index.load, rows)
+
+    def _clear_history(self, bookmark_rows):
+        try: self.history.clear()
+        except sqlite3.Error as e: self.critical_error_signal.emit(f"Failed to clear history: {e}"); return
+        self.suggestion_index.clear()
+        self.suggestion_index.load(bookmark_rows)
+
+    def _load_suggestions(self):
+        try: self.suggestion_index.load((url, title, visits, last_visit, None) for url, title, visits, last_visit in self.history.search("", 20000))
+        except sqlite3.Error as e: self.critical_error_signal.emit(f"Failed to load history suggestions: {e}")
+
+    def on_bookmark_hovered(self):
+        if action := self.sender(): self.speculator.hint(action.data(), self.profile)
 
     def navigate_bookmark(self):
-        if action := self.sender(): self.add_new_tab(url=action.data())
+        if not (action := self.sender()): return
+        if speculation := self.speculator.claim(action.data(), self.profile, adopt=True):
+            tab = self.add_new_tab(url=action.data(), background=True)
+            self.swap_in_speculation(tab, speculation); self.tabs.setCurrentWidget(tab)
+        else: self.add_new_tab(url=action.data())
         
     def load_bookmarks(self):
         file_name, _ = QFileDialog.getOpenFileName(self, "Open", "", "JSON (*.json)")
@@ -399,29 +3059,321 @@ class Browser(QMainWindow):
 
     def _load_bookmarks_from_file(self, file_name):
         try:
-            with open(file_name, "r") as f: self.bookmarks = json.load(f)
+            with open(file_name, "r") as f: bookmarks = json.load(f)
+            self.bookmarks_loaded_signal.emit([entry for entry in bookmarks if isinstance(entry, list) and len(entry) >= 2])
         except Exception as e: self.critical_error_signal.emit(f"Failed to load: {e}")
 
     def save_bookmarks(self):
         file_name, _ = QFileDialog.getSaveFileName(self, "Save", "", "JSON (*.json)")
-        if file_name: self.executor.submit(self._save_bookmarks_to_file, file_name)
+        if file_name: self.executor.submit(self._save_bookmarks_to_file, file_name, self.bookmark_store.export())
 
-    def _save_bookmarks_to_file(self, file_name):
+    def _save_bookmarks_to_file(self, file_name, bookmarks):
         try:
-            with open(file_name, "w") as f: json.dump(self.bookmarks, f, indent=4)
+            with open(file_name, "w") as f: json.dump(bookmarks, f, indent=4)
         except Exception as e: self.critical_error_signal.emit(f"Failed to save: {e}")
 
-    def on_load_started(self): self.progress_bar.show()
-    def on_load_progress(self, progress): self.progress_bar.setValue(progress)
-    def on_load_finished(self, success):
-        self.progress_bar.hide(); self.progress_bar.setValue(0)
+    def on_load_started(self, tab):
+        startup_trace.mark_once("first load started")
+        tab.load_progress = 0
+        tab.page_load = PageLoad(tab.url, self.ad_block_interceptor.blocking, self.ad_block_interceptor.request_counter.totals())
+        if tab is self.tabs.currentWidget(): self.update_progress_bar(tab)
+
+    def on_load_progress(self, tab, progress):
+        tab.load_progress = progress
+        if tab is self.tabs.currentWidget(): self.progress_bar.setValue(progress)
+
+    def on_load_finished(self, tab, success):
+        startup_trace.mark_once("first load finished")
+        tab.load_progress = -1
+        if tab is self.tabs.currentWidget(): self.update_progress_bar(tab)
+        load, tab.page_load = tab.page_load, None
+        if load and tab.view:
+            load.finish(tab.view.url().toString(), tab.view.title(), success, self.ad_block_interceptor.request_counter.totals())
+            self.collect_page_metrics(tab.view, load, self.container_for(tab))
+
+    def update_progress_bar(self, tab):
+        if tab is not None and tab.load_progress >= 0: self.progress_bar.setValue(tab.load_progress); self.progress_bar.show()
+        else: self.progress_bar.hide(); self.progress_bar.setValue(0)
     def critical_error(self, message): QMessageBox.critical(self, "Error", message)
 
+    def closeEvent(self, event):
+        self.session_timer.stop()
+        self.download_engine.pause_all()
+        self._write_session(self.session_snapshot(), self.session_store.next_sequence())
+        self.history.close()
+        super().closeEvent(event)
+
+class HotPathProfiler:
+    HOT_PATHS = (
+        (AdBlockInterceptor, "interceptRequest"), (Browser, "update_bookmark_menu"), (Browser, "populate_bookmark_menu"),
+        (Browser, "on_bookmark_added"), (Browser, "_load_bookmarks_from_file"), (Browser, "_save_bookmarks_to_file"),
+        (BookmarkStore, "load"), (BookmarkStore, "flush"), (DownloadListModel, "record_changed"), (DownloadListModel, "refresh_active"),
+        (Browser, "on_load_finished"), (SuggestionIndex, "query"), (HistoryStore, "flush"),
+    )
+    BUCKETS = 25
+
+    def __init__(self, use_cprofile=False, output=None):
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.output = output or ("dbb-profile" if use_cprofile else None)
+        # cProfile only sees the GUI thread; handlers on worker threads still get timing counters
+        if use_cprofile: import cProfile
+        self.profile = cProfile.Profile() if use_cprofile else None
+
+    def wrap(self, name, function):
+        stats = self.stats[name] = [0, 0, 0, [0] * self.BUCKETS]
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try: return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter_ns() - start
+                with self.lock:
+                    stats[0] += 1; stats[1] += elapsed; stats[2] = max(stats[2], elapsed)
+                    stats[3][min(self.BUCKETS - 1, (elapsed // 1000).bit_length())] += 1
+        return timed
+
+    def install(self):
+        for cls, method in self.HOT_PATHS: setattr(cls, method, self.wrap(f"{cls.__name__}.{method}", getattr(cls, method)))
+        if self.profile: self.profile.enable()
+
+    @staticmethod
+    def percentile(histogram, calls, fraction):
+        seen = 0
+        for bucket, count in enumerate(histogram):
+            seen += count
+            if seen >= fraction * calls: return 1 << bucket
+        return 1 << (len(histogram) - 1)
+
+    def report(self):
+        lines = [f"{'handler':<42}{'calls':>9}{'total ms':>11}{'mean us':>10}{'p50 us':>9}{'p99 us':>9}{'max us':>10}"]
+        with self.lock: stats = [(name, calls, total, peak, list(histogram)) for name, (calls, total, peak, histogram) in self.stats.items() if calls]
+        for name, calls, total, peak, histogram in sorted(stats, key=lambda entry: -entry[2]):
+            # Percentiles are bucket upper bounds of the power-of-two histogram
+            lines.append(f"{name:<42}{calls:>9}{total / 1e6:>11.2f}{total / calls / 1e3:>10.1f}"
+                         f"{'<' + str(self.percentile(histogram, calls, 0.5)):>9}{'<' + str(self.percentile(histogram, calls, 0.99)):>9}{peak / 1e3:>10.1f}")
+            lines.append("    " + " ".join(f"<{1 << bucket}us:{count}" for bucket, count in enumerate(histogram) if count))
+        return "\n".join(lines)
+
+    def dump(self):
+        report = self.report()
+        print(report, file=sys.stderr)
+        if not self.output: return
+        try:
+            with open(self.output + ".txt", "w") as f:
+                f.write(report + "\n")
+                if self.profile:
+                    self.profile.disable(); self.profile.dump_stats(self.output + ".prof")
+                    import pstats
+                    f.write("\n"); pstats.Stats(self.profile, stream=f).sort_stats("cumulative").print_stats(40)
+        except OSError as e: print(f"Failed to write profile to {self.output}: {e}", file=sys.stderr)
+
+class BatchJob:
+    __slots__ = ("index", "load", "peak_rss", "error", "screenshot", "pdf")
+
+    def __init__(self, index, load):
+        self.index, self.load = index, load
+        self.peak_rss, self.error = 0, ""
+        self.screenshot, self.pdf = None, None
+
+    def as_dict(self):
+        return dict(self.load.as_dict(), peak_rss_bytes=self.peak_rss, error=self.error, screenshot=self.screenshot, pdf=self.pdf)
+
+class BatchRunner(QObject):
+    finished = Signal(int)
+    RESULT_FIELDS = PageLoad.EXPORT_FIELDS + ("peak_rss_bytes", "error", "screenshot", "pdf")
+
+    def __init__(self, urls, concurrency=4, timeout=30, settle=0, screenshot_dir=None, pdf_dir=None, window_size=(1280, 800),
+                 adblock=False, profile_dir=None, data_dir=None, output=None):
+        super().__init__()
+        self.pending = collections.deque(enumerate(urls))
+        self.results = [None] * len(urls)
+        self.timeout, self.settle = timeout, settle
+        self.screenshot_dir, self.pdf_dir, self.output = screenshot_dir, pdf_dir, output
+        for directory in (screenshot_dir, pdf_dir):
+            if directory: os.makedirs(directory, exist_ok=True)
+        self.started = time.monotonic()
+        self.peak_browser_rss = 0
+
+        # Without a profile directory the pages share an off-the-record profile, so every run starts cold
+        if profile_dir:
+            self.profile = QWebEngineProfile("batch", self)
+            self.profile.setPersistentStoragePath(os.path.join(profile_dir, "storage"))
+            self.profile.setCachePath(os.path.join(profile_dir, "cache"))
+            self.profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.DiskHttpCache)
+        else: self.profile = QWebEngineProfile(self)
+        self.interceptor = AdBlockInterceptor(parent=self); self.interceptor.blocking = adblock
+        if adblock and data_dir:
+            compiler = BlocklistCompiler(os.path.join(data_dir, "adblock"), AdBlockInterceptor.DEFAULT_AD_DOMAINS)
+            if snapshot := compiler.open_snapshot(): self.interceptor.blocklist = snapshot
+            self.interceptor.url_filters = compiler.load_url_filters()
+        self.profile.setUrlRequestInterceptor(self.interceptor)
+
+        self.jobs, self.deadlines, self.load_started = {}, {}, {}
+        for _ in range(max(1, min(concurrency, len(urls)))):
+            view = QWebEngineView(); view.setPage(QWebEnginePage(self.profile, view))
+            view.resize(*window_size); view.show()
+            view.loadStarted.connect(lambda view=view: self.load_started.__setitem__(view, True))
+            view.loadFinished.connect(lambda ok, view=view: self.on_load_finished(view, ok))
+            view.page().pdfPrintingFinished.connect(lambda path, ok, view=view: self.on_pdf_finished(view, ok))
+            deadline = QTimer(self); deadline.setSingleShot(True); deadline.setInterval(int(timeout * 1000))
+            deadline.timeout.connect(lambda view=view: self.on_timeout(view))
+            self.deadlines[view] = deadline
+        self.rss_timer = QTimer(self); self.rss_timer.setInterval(50)
+        self.rss_timer.timeout.connect(self.sample_rss)
+
+    def start(self):
+        self.rss_timer.start()
+        for view in list(self.deadlines): self.next(view)
+
+    def next(self, view):
+        self.jobs.pop(view, None)
+        if not self.pending:
+            if not self.jobs: self.finish()
+            return
+        index, url = self.pending.popleft()
+        qurl = QUrl.fromUserInput(url, os.getcwd())
+        self.jobs[view] = BatchJob(index, PageLoad(qurl.toString(), self.interceptor.blocking, self.interceptor.request_counter.totals()))
+        self.deadlines[view].start()
+        # A loadFinished that arrives before this job's loadStarted belongs to the previous, stopped load
+        self.load_started[view] = False
+        view.load(qurl)
+
+    def sample_rss(self):
+        self.peak_browser_rss = max(self.peak_browser_rss, process_rss(os.getpid()))
+        # Chromium may share one renderer between same-site pages, so concurrent loads of a site see each other's memory
+        for view, job in self.jobs.items(): job.peak_rss = max(job.peak_rss, process_rss(view.page().renderProcessPid()))
+
+    def on_timeout(self, view):
+        if job := self.jobs.get(view):
+            # The stopped page gets no metrics script, and the loadFinished that stopping it emits is ignored
+            job.error = f"Timed out after {self.timeout} s"
+            self.load_started[view] = False; view.stop()
+            self.finish_load(view, job, False)
+
+    def on_load_finished(self, view, ok):
+        job = self.jobs.get(view)
+        if job and self.load_started.get(view): self.finish_load(view, job, ok)
+
+    def finish_load(self, view, job, ok):
+        if job.load.finished: return
+        self.deadlines[view].stop()
+        job.load.finish(view.url().toString(), view.title(), ok, self.interceptor.request_counter.totals())
+        if job.error: QTimer.singleShot(self.settle, lambda: self.complete(view, job)); return
+        if not ok: job.error = "Load failed"
+        QTimer.singleShot(self.settle, lambda: view.page().runJavaScript(Browser.PAGE_METRICS_JS, 0, lambda result: self.on_metrics(view, job, result)))
+
+    def output_path(self, directory, job, extension):
+        name = re.sub(r"[^A-Za-z0-9]+", "-", job.load.url.split("://", 1)[-1]).strip("-")[:80]
+        return os.path.join(directory, f"{job.index:04d}-{name or 'page'}.{extension}")
+
+    def on_metrics(self, view, job, result):
+        if self.jobs.get(view) is not job: return
+        job.load.set_timing(result); self.sample_rss()
+        if job.load.ok and self.screenshot_dir:
+            job.screenshot = self.output_path(self.screenshot_dir, job, "png")
+            if not view.grab().save(job.screenshot): job.error, job.screenshot = "Failed to save screenshot", None
+        if job.load.ok and self.pdf_dir:
+            job.pdf = self.output_path(self.pdf_dir, job, "pdf"); view.page().printToPdf(job.pdf)
+        else: self.complete(view, job)
+
+    def on_pdf_finished(self, view, ok):
+        if job := self.jobs.get(view):
+            if not ok: job.error, job.pdf = "Failed to print PDF", None
+            self.complete(view, job)
+
+    def complete(self, view, job):
+        row = self.results[job.index] = job.as_dict()
+        duration = f"{row['duration_ms']:.0f} ms" if row["duration_ms"] is not None else "-"
+        print(f"{'ok ' if job.load.ok else 'ERR'} {duration:>9}  blocked {job.load.blocked:>4}/{job.load.allowed + job.load.blocked:<4}  "
+              f"rss {format_bytes(job.peak_rss):>10}  {job.load.url}" + (f"  ({job.error})" if job.error else ""), flush=True)
+        self.next(view)
+
+    def summary(self):
+        durations = sorted(row["duration_ms"] for row in self.results if row and row["ok"] and row["duration_ms"] is not None)
+        percentile = lambda p: durations[min(len(durations) - 1, int(p * len(durations)))] if durations else None
+        return {
+            "pages": len(self.results), "failed": sum(1 for row in self.results if not row or not row["ok"]),
+            "median_ms": percentile(0.5), "p95_ms": percentile(0.95), "wall_ms": round((time.monotonic() - self.started) * 1000, 1),
+            "allowed_requests": sum(row["allowed_requests"] for row in self.results if row), "blocked_requests": sum(row["blocked_requests"] for row in self.results if row),
+            "peak_renderer_rss_bytes": max((row["peak_rss_bytes"] for row in self.results if row), default=0), "peak_browser_rss_bytes": self.peak_browser_rss,
+        }
+
+    def finish(self):
+        self.rss_timer.stop()
+        summary = self.summary()
+        print(f"{summary['pages']} pages, {summary['failed']} failed, median {summary['median_ms']} ms, p95 {summary['p95_ms']} ms, "
+              f"{summary['blocked_requests']} of {summary['allowed_requests'] + summary['blocked_requests']} requests blocked, "
+              f"peak RSS {format_bytes(summary['peak_renderer_rss_bytes'])} renderer / {format_bytes(summary['peak_browser_rss_bytes'])} browser", file=sys.stderr)
+        try:
+            if self.output: write_metrics(self.output, "loads", self.results, self.interceptor.request_counter.export(), self.RESULT_FIELDS, summary)
+        except OSError as e:
+            print(f"Failed to write {self.output}: {e}", file=sys.stderr); self.finished.emit(2); return
+        self.finished.emit(1 if summary["failed"] else 0)
+
+def read_url_list(file_name):
+    with (sys.stdin if file_name == "-" else open(file_name, "r")) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(prog="dbb-browser", description="DBB Browser")
+    parser.add_argument("urls", nargs="*", help="URLs or local files to open")
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument("--batch", action="store_true", help="load the URLs headlessly and report timings instead of opening a window")
+    batch.add_argument("--url-file", help="file with one URL per line ('-' for stdin)")
+    batch.add_argument("--concurrency", type=int, default=4, help="number of pages loading at once (default: 4)")
+    batch.add_argument("--timeout", type=float, default=30, help="seconds before a load is abandoned (default: 30)")
+    batch.add_argument("--settle", type=int, default=0, help="milliseconds to wait after load before measuring and capturing")
+    batch.add_argument("--repeat", type=int, default=1, help="load the whole list this many times, e.g. 2 for a cold and a warm pass")
+    batch.add_argument("--window-size", default="1280x800", help="viewport size as WIDTHxHEIGHT (default: 1280x800)")
+    batch.add_argument("--screenshots", metavar="DIR", help="save a PNG of each loaded page into DIR")
+    batch.add_argument("--pdf", metavar="DIR", help="print each loaded page to a PDF in DIR")
+    batch.add_argument("--adblock", action="store_true", help="block requests with the browser's compiled blocklist")
+    batch.add_argument("--profile-dir", help="keep cookies and the disk cache in DIR between runs (default: off-the-record)")
+    batch.add_argument("--output", help="write per-page results to a .json or .csv file")
+    profiling = parser.add_argument_group("profiling")
+    profiling.add_argument("--startup-trace", action="store_true", default=bool(os.environ.get("DBB_STARTUP_TRACE")),
+                           help="print how long each start-up phase took once the first page has loaded (env: DBB_STARTUP_TRACE)")
+    profiling.add_argument("--profile", nargs="?", const="counters", choices=("counters", "cprofile"), default=os.environ.get("DBB_PROFILE") or None,
+                           help="time hot handlers and print latency histograms on exit; 'cprofile' also records a cProfile (env: DBB_PROFILE)")
+    profiling.add_argument("--profile-output", metavar="PREFIX", default=os.environ.get("DBB_PROFILE_OUTPUT"),
+                           help="write the report to PREFIX.txt and the cProfile data to PREFIX.prof (env: DBB_PROFILE_OUTPUT)")
+    return parser.parse_known_args(argv[1:])
+
+def run_batch(app, args):
+    urls = list(args.urls)
+    try:
+        if args.url_file: urls += read_url_list(args.url_file)
+        width, height = map(int, args.window_size.lower().split("x"))
+    except (OSError, ValueError) as e:
+        print(f"Invalid batch arguments: {e}", file=sys.stderr); return 2
+    if not urls:
+        print("No URLs given; pass them as arguments or with --url-file", file=sys.stderr); return 2
+    data_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+    runner = BatchRunner(urls * max(1, args.repeat), args.concurrency, args.timeout, args.settle, args.screenshots, args.pdf,
+                         (width, height), args.adblock, args.profile_dir, data_dir, args.output)
+    runner.finished.connect(app.exit)
+    QTimer.singleShot(0, runner.start)
+    return app.exec()
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    args, qt_args = parse_arguments(sys.argv)
+    if args.batch:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        os.environ.setdefault("QTWEBENGINE_CHROMIUM_FLAGS", "--disable-gpu")
+    app = QApplication(sys.argv[:1] + qt_args)
+    app.setApplicationName("DBB Browser")
+    startup_trace.mark("QApplication")
+    if args.profile:
+        profiler = HotPathProfiler(args.profile == "cprofile", args.profile_output); profiler.install()
+        app.aboutToQuit.connect(profiler.dump)
+    if args.batch: sys.exit(run_batch(app, args))
     app.setStyle('Breeze')
-    profile = QWebEngineProfile.defaultProfile()
-    profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.MemoryHttpCache)
     browser = Browser()
+    for url in args.urls: browser.add_new_tab(QUrl.fromUserInput(url, os.getcwd()).toString())
     browser.show()
+    if args.startup_trace:
+        startup_trace.enabled = True
+        QTimer.singleShot(0, lambda: startup_trace.mark_once("event loop running"))
+        QTimer.singleShot(30 * 1000, startup_trace.report)
     sys.exit(app.exec())
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+try: from main import BlocklistCompiler, CompiledBlocklist, DomainBlocklist
+except ImportError as e: pytest.skip(f"needs PySide6 with QtWebEngine: {e}", allow_module_level=True)
+
+def word(rng, length):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(length))
+
+@pytest.fixture
+def lists():
+    rng = random.Random(11)
+    domains = [f"{word(rng, rng.randint(3, 10))}{i}.{rng.choice(('com', 'net', 'co.uk', 'io'))}" for i in range(5000)]
+    exceptions = [f"{rng.choice(('cdn', 'www', 'static'))}.{domain}" for domain in rng.sample(domains, 200)] + rng.sample(domains, 50)
+    hosts = [f"{rng.choice(('', 'a.', 'cdn.', 'www.', 'x.y.'))}{domain}" for domain in domains + exceptions]
+    hosts += [f"{word(rng, 8)}.{rng.choice(('com', 'net', 'org'))}" for _ in range(2000)] + ["com", "", "CDN." + domains[0].upper() + "."]
+    return domains, exceptions, hosts
+
+def snapshot(tmp_path, domains, exceptions):
+    file_name = str(tmp_path / "snapshot.bin")
+    CompiledBlocklist.write(file_name, map(CompiledBlocklist.hash_domain, domains), map(CompiledBlocklist.hash_domain, exceptions))
+    return CompiledBlocklist(file_name)
+
+def test_snapshot_matches_like_the_domain_blocklist(tmp_path, lists):
+    domains, exceptions, hosts = lists
+    reference, compiled = DomainBlocklist(domains, exceptions), snapshot(tmp_path, domains, exceptions)
+    assert len(compiled) == len(reference)
+    assert [compiled.matches(host) for host in hosts] == [reference.matches(host) for host in hosts]
+    assert any(reference.matches(host) for host in hosts) and not all(reference.matches(host) for host in hosts)
+    compiled.close()
+
+def test_bucket_offsets_bound_every_hash(tmp_path, lists):
+    compiled = snapshot(tmp_path, lists[0], ())
+    offsets, hashes = compiled.offsets, compiled.domain_hashes
+    assert len(offsets) == (1 << CompiledBlocklist.BUCKET_BITS) + 1 and offsets[0] == 0 and offsets[-1] == len(hashes)
+    assert all(offsets[i] <= offsets[i + 1] for i in range(len(offsets) - 1))
+    for i, h in enumerate(hashes): assert offsets[h >> compiled.bucket_shift] <= i < offsets[(h >> compiled.bucket_shift) + 1]
+    compiled.close()
+
+def test_hashes_in_the_first_and_last_bucket(tmp_path):
+    edges = [0, 1, (1 << 48) - 1, 1 << 48, (1 << 64) - 2, (1 << 64) - 1]
+    file_name = str(tmp_path / "edges.bin")
+    CompiledBlocklist.write(file_name, edges)
+    compiled = CompiledBlocklist(file_name)
+    for h in edges:
+        bucket = h >> compiled.bucket_shift
+        assert compiled.contains(compiled.domain_hashes, h, compiled.offsets[bucket], compiled.offsets[bucket + 1])
+    assert not compiled.contains(compiled.domain_hashes, 2, compiled.offsets[0], compiled.offsets[1])
+    compiled.close()
+
+def test_compiled_sources_merge_into_one_snapshot(tmp_path, lists):
+    domains, exceptions, hosts = lists
+    hosts_file, easylist = tmp_path / "hosts.txt", tmp_path / "easylist.txt"
+    hosts_file.write_text("".join(f"0.0.0.0 {domain}\n" for domain in domains[:2500]))
+    easylist.write_text("".join(f"||{domain}^\n" for domain in domains[2500:]) + "".join(f"@@||{domain}^\n" for domain in exceptions))
+    compiled = BlocklistCompiler(str(tmp_path / "cache")).compile([str(hosts_file), str(easylist)])
+    reference = DomainBlocklist(domains, exceptions)
+    assert [compiled.matches(host) for host in hosts] == [reference.matches(host) for host in hosts]
+    compiled.close()
+
+def test_missing_source_is_reported_once(tmp_path):
+    source = tmp_path / "list.txt"
+    source.write_text("tracker.example.com\n")
+    compiler = BlocklistCompiler(str(tmp_path / "cache"))
+    compiler.compile([str(source)]).close()
+    assert compiler.is_current() and not compiler.warnings
+    source.unlink()
+    compiler = BlocklistCompiler(str(tmp_path / "cache"))
+    assert not compiler.is_current()
+    compiled = compiler.compile()
+    assert compiled.matches("tracker.example.com") and compiler.sources() == [str(source)]
+    assert compiler.warnings == [f"Blocklist source {source} is missing, keeping the rules compiled from it before"]
+    compiled.close()
+    assert BlocklistCompiler(str(tmp_path / "cache")).is_current()
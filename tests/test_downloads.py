@@ -0,0 +1,131 @@
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+try: from main import DownloadEngine, DownloadJob
+except ImportError as e: pytest.skip(f"needs PySide6 with QtWebEngine: {e}", allow_module_level=True)
+
+PAYLOAD = random.Random(7).randbytes(3 * 1024 * 1024)
+CUT = 100 * 1024
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args): pass
+
+    def do_GET(self):
+        spec = self.server.specs[self.path]
+        with self.server.lock: self.server.cookies.append((self.headers.get("Host"), self.path, self.headers.get("Cookie")))
+        if spec.get("redirect"):
+            self.send_response(302); self.send_header("Location", spec["redirect"]); self.send_header("Content-Length", "0"); self.end_headers()
+            return
+        payload, range_header = spec["payload"], self.headers.get("Range")
+        probe = range_header == "bytes=0-0"
+        try:
+            if spec["ranges"] and range_header:
+                start, end = map(int, range_header.split("=", 1)[1].split("-"))
+                body = payload[start:end + 1]
+                self.send_response(206); self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+            else:
+                body = payload; self.send_response(200)
+            if spec["chunked"]:
+                # The terminating zero-size chunk is never sent, so the length of the body is unknown and it ends short
+                self.send_header("Transfer-Encoding", "chunked"); self.end_headers()
+                for i in range(0, CUT, 16 * 1024): self.wfile.write(b"%x\r\n%s\r\n" % (16 * 1024, body[i:i + 16 * 1024]))
+                self.close_connection = True; return
+            self.send_header("Content-Length", str(len(body))); self.end_headers()
+            with self.server.lock:
+                drop = not probe and spec["drops"] > 0
+                if drop: spec["drops"] -= 1
+            if drop:
+                self.wfile.write(body[:CUT]); self.close_connection = True; return
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError): self.close_connection = True
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.specs, server.cookies = {}, []
+    thread = threading.Thread(target=server.serve_forever, daemon=True); thread.start()
+    yield server
+    server.shutdown(); server.server_close()
+
+def serve(server, path, payload=PAYLOAD, ranges=True, drops=0, chunked=False, redirect=None, host="127.0.0.1"):
+    server.specs[path] = {"payload": payload, "ranges": ranges, "drops": drops, "chunked": chunked, "redirect": redirect}
+    return f"http://{host}:{server.server_address[1]}{path}"
+
+def cookie(name, value, domain, path="/", secure=False, host_only=True, expires=None):
+    return (name, value, domain.lstrip("."), path, secure, host_only, expires)
+
+def download(url, path, max_retries=DownloadEngine.MAX_RETRIES, timeout=30, cookies=None):
+    engine = DownloadEngine(segments_per_download=4)
+    engine.MAX_RETRIES = max_retries
+    job = engine.enqueue(url, str(path), cookies=cookies)
+    deadline = time.monotonic() + timeout
+    while job.state in (DownloadJob.QUEUED, DownloadJob.ACTIVE) and time.monotonic() < deadline: time.sleep(0.05)
+    return job
+
+def test_segmented_download_with_ranges(server, tmp_path):
+    job = download(serve(server, "/ranges"), tmp_path / "file.bin")
+    assert job.state == DownloadJob.COMPLETED
+    assert len(job.segments) > 1
+    assert (tmp_path / "file.bin").read_bytes() == PAYLOAD
+    assert not os.path.exists(job.part_path) and not os.path.exists(job.state_path)
+
+def test_ranged_segment_closed_early_resumes_where_it_stopped(server, tmp_path):
+    job = download(serve(server, "/ranges-drop", drops=1), tmp_path / "file.bin")
+    assert job.state == DownloadJob.COMPLETED
+    assert server.specs["/ranges-drop"]["drops"] == 0
+    assert (tmp_path / "file.bin").read_bytes() == PAYLOAD
+
+def test_download_without_ranges(server, tmp_path):
+    job = download(serve(server, "/plain", ranges=False), tmp_path / "file.bin")
+    assert job.state == DownloadJob.COMPLETED
+    assert (tmp_path / "file.bin").read_bytes() == PAYLOAD
+
+def test_download_without_ranges_closed_early_starts_over(server, tmp_path):
+    payload = PAYLOAD[:300 * 1024]
+    job = download(serve(server, "/plain-drop", payload=payload, ranges=False, drops=1), tmp_path / "file.bin")
+    assert job.state == DownloadJob.COMPLETED
+    assert server.specs["/plain-drop"]["drops"] == 0
+    assert (tmp_path / "file.bin").read_bytes() == payload
+
+def test_download_without_ranges_that_always_closes_early_fails(server, tmp_path):
+    job = download(serve(server, "/plain-broken", payload=PAYLOAD[:300 * 1024], ranges=False, drops=10), tmp_path / "file.bin", max_retries=1)
+    assert job.state == DownloadJob.FAILED
+    assert not (tmp_path / "file.bin").exists()
+
+def test_unknown_length_body_cut_short_fails(server, tmp_path):
+    job = download(serve(server, "/chunked", ranges=False, chunked=True), tmp_path / "file.bin", max_retries=1)
+    assert job.total == -1
+    assert job.state == DownloadJob.FAILED and job.error
+    assert not (tmp_path / "file.bin").exists()
+
+def test_cookies_are_not_forwarded_to_a_redirect_on_another_host(server, tmp_path):
+    target = serve(server, "/target", payload=PAYLOAD[:1024], host="localhost")
+    url = serve(server, "/redirect", redirect=target)
+    job = download(url, tmp_path / "file.bin", cookies={"127.0.0.1": [cookie("session", "SECRET", "127.0.0.1")]})
+    assert job.state == DownloadJob.COMPLETED
+    assert (tmp_path / "file.bin").read_bytes() == PAYLOAD[:1024]
+    sent = {(host.split(":")[0], path): value for host, path, value in server.cookies}
+    assert sent[("127.0.0.1", "/redirect")] == "session=SECRET"
+    assert sent[("localhost", "/target")] is None
+
+def test_cookie_header_honours_secure_path_host_only_and_expiry():
+    job = DownloadJob("https://files.example.com/downloads/a.zip", "/tmp/a.zip", cookies={
+        "example.com": [cookie("domain", "1", ".example.com", host_only=False), cookie("host", "2", "example.com")],
+        "files.example.com": [
+            cookie("secure", "3", "files.example.com", secure=True), cookie("deep", "4", "files.example.com", path="/downloads"),
+            cookie("other", "5", "files.example.com", path="/downloadsx"), cookie("expired", "6", "files.example.com", expires=time.time() - 60),
+        ],
+    })
+    assert job.cookie_header("https://files.example.com/downloads/a.zip") == "deep=4; secure=3; domain=1"
+    assert job.cookie_header("http://files.example.com/downloads/a.zip") == "deep=4; domain=1"
+    assert job.cookie_header("https://example.com/") == "domain=1; host=2"
+    assert job.cookie_header("https://example.org/") is None
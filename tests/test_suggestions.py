@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+try: from main import SuggestionIndex
+except ImportError as e: pytest.skip(f"needs PySide6 with QtWebEngine: {e}", allow_module_level=True)
+
+@pytest.fixture
+def index():
+    index = SuggestionIndex()
+    now = time.time()
+    index.load([
+        ("https://www.github.com/kinoite/DBB-Browser", "DBB Browser", 5, now, None),
+        ("https://intranet.corp/dashboard", "Team Dashboard", 3, now, None),
+        ("http://example.org/docs", "Example Docs", 1, now, True),
+    ])
+    return index
+
+@pytest.mark.parametrize("text, url", [
+    ("git", "https://www.github.com/kinoite/DBB-Browser"),
+    ("www.git", "https://www.github.com/kinoite/DBB-Browser"),
+    ("https://www.github", "https://www.github.com/kinoite/DBB-Browser"),
+    ("HTTPS://WWW.GitHub.com/kinoite", "https://www.github.com/kinoite/DBB-Browser"),
+    ("https://intranet.corp/dash", "https://intranet.corp/dashboard"),
+    ("intranet.corp/dash", "https://intranet.corp/dashboard"),
+    ("http://example.org team", None),
+    ("example.org docs", "http://example.org/docs"),
+])
+def test_url_like_queries_are_normalised_like_the_index(index, text, url):
+    results = [result_url for _, result_url, _, _ in index.query(text)]
+    assert results[:1] == ([url] if url else [])
+
+def test_scheme_only_input_has_no_suggestions(index):
+    assert index.query("https://") == []
+    assert index.query("www.") == []
+
+def test_open_tabs_match_normalised_tokens(index):
+    tab = object()
+    results = index.query("https://www.github", open_tabs=[("https://github.com/", "GitHub", tab)])
+    assert results[0] == ("tab", "https://github.com/", "GitHub", tab)
+
+def test_clear_forgets_every_entry(index):
+    index.clear()
+    assert index.query("git") == [] and not index.entries and not index.terms
+    index.load([("http://example.org/docs", "Example Docs", 0, None, True)])
+    assert [url for _, url, _, _ in index.query("docs")] == ["http://example.org/docs"]
+    assert index.query("dashboard") == []
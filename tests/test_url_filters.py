@@ -0,0 +1,60 @@
+import pytest
+
+try: from main import AdBlockInterceptor, BlocklistCompiler, PublicSuffixList, UrlFilterIndex
+except ImportError as e: pytest.skip(f"needs PySide6 with QtWebEngine: {e}", allow_module_level=True)
+
+HOSTS = [
+    ("evil.co.uk", "evil.co.uk"), ("www.bbc.co.uk", "bbc.co.uk"), ("co.uk", "co.uk"), ("a.b.example.com", "example.com"),
+    ("example.com", "example.com"), ("localhost", "localhost"), ("10.0.0.1", "10.0.0.1"), ("x.github.io", "x.github.io"),
+]
+
+@pytest.mark.parametrize("suffixes", [PublicSuffixList.default(), PublicSuffixList(PublicSuffixList.FALLBACK_RULES)], ids=["default", "fallback"])
+def test_base_domain_keeps_multi_label_public_suffixes_apart(suffixes):
+    assert [suffixes.base_domain(host) for host, _ in HOSTS] == [expected for _, expected in HOSTS]
+
+def test_wildcard_and_exception_rules():
+    suffixes = PublicSuffixList(["ck", "*.ck", "!www.ck"])
+    assert suffixes.base_domain("a.b.foo.ck") == "b.foo.ck"
+    assert suffixes.base_domain("sub.www.ck") == "www.ck"
+
+def test_third_party_rules_on_multi_label_suffixes():
+    index = UrlFilterIndex.from_lines(["||tracker.co.uk^$third-party", "||cdn.co.uk^$first-party"])
+    assert index.matches("https://tracker.co.uk/t.js", "tracker.co.uk", "script", "bbc.co.uk")
+    assert not index.matches("https://tracker.co.uk/t.js", "tracker.co.uk", "script", "www.tracker.co.uk")
+    assert not index.matches("https://cdn.co.uk/a.js", "cdn.co.uk", "script", "evil.co.uk")
+    assert index.matches("https://cdn.co.uk/a.js", "cdn.co.uk", "script", "static.cdn.co.uk")
+
+def compile_list(tmp_path, lines):
+    source = tmp_path / "list.txt"
+    source.write_text("\n".join(lines) + "\n")
+    compiler = BlocklistCompiler(str(tmp_path / "cache"))
+    blocklist = compiler.compile([str(source)])
+    return compiler, AdBlockInterceptor(blocklist, compiler.load_url_filters())
+
+def test_domain_exceptions_override_path_rules(tmp_path):
+    _, interceptor = compile_list(tmp_path, ["/ads/banner*", "||ads.example.com^", "@@||goodsite.com^", "@@||ok.ads.example.com^"])
+    assert interceptor.should_block("https://other.com/ads/banner1.js", "other.com", "script", "other.com")
+    assert not interceptor.should_block("https://goodsite.com/ads/banner1.js", "goodsite.com", "script", "goodsite.com")
+    assert not interceptor.should_block("https://cdn.goodsite.com/ads/banner1.js", "cdn.goodsite.com", "script", "other.com")
+    assert interceptor.should_block("https://ads.example.com/x.js", "ads.example.com", "script", "other.com")
+    assert not interceptor.should_block("https://ok.ads.example.com/ads/banner1.js", "ok.ads.example.com", "script", "other.com")
+
+def test_ignored_hosts_entries_do_not_become_url_rules(tmp_path):
+    compiler, interceptor = compile_list(tmp_path, [
+        "# hosts", "127.0.0.1 localhost", "0.0.0.0 localhost", "::1 ip6-localhost", "255.255.255.255 broadcasthost",
+        "0.0.0.0 tracker.example.com", "#comment", "/banner/ad.js",
+    ])
+    assert (tmp_path / "cache" / compiler.manifest["sources"][str(tmp_path / "list.txt")]["rules"]).read_text() == "/banner/ad.js"
+    assert not interceptor.should_block("http://localhost/", "localhost", "document")
+    assert interceptor.should_block("https://tracker.example.com/", "tracker.example.com", "script", "other.com")
+
+def test_parts_compiled_by_an_older_version_are_rebuilt(tmp_path):
+    compiler, _ = compile_list(tmp_path, ["/ads/banner*", "@@||goodsite.com^"])
+    entry = compiler.manifest["sources"][str(tmp_path / "list.txt")]
+    entry["fingerprint"] = entry["fingerprint"].split(":", 1)[1]
+    compiler.write_manifest()
+    (tmp_path / "cache" / entry["rules"]).write_text("/ads/banner*")
+    compiler = BlocklistCompiler(str(tmp_path / "cache"))
+    assert not compiler.is_current()
+    compiler.compile()
+    assert (tmp_path / "cache" / entry["rules"]).read_text() == "/ads/banner*\n@@||goodsite.com^"